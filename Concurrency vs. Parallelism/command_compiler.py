@@ -0,0 +1,206 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from mine_grid import MineGrid, RoverTrack, SparseTrack
+
+TURN, MOVE = "T", "M"
+TRACE_VERSION = 1  # Bump whenever trace_path's results change, so result_cache does not reuse old ones
+
+DIRECTIONS = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # N, E, S, W; turning right is +1
+NORTH, EAST, SOUTH, WEST = range(4)
+
+# A run of moves plus the D that may follow it, or a run of turns; anything else is a no-op
+_TOKENS = re.compile(r"(M+)(D?)|([LR]+)")
+
+
+def compile_commands(commands):
+    """Compile a command string into opcodes.
+
+    Runs of turns fold into one (TURN, quarter turns to the right) and runs of
+    moves become (MOVE, count, dig), where dig says the run is directly
+    followed by a D, so its last move may dig a mine.
+    """
+    return list(compile_stream([commands]))
+
+
+def compile_stream(chunks):
+    """Compile a program arriving as pieces of a command string, yielding its opcodes as they are known.
+
+    Gives the same opcodes as compile_commands on the joined string. A run
+    that reaches the end of a piece stays open as a count until the next
+    piece shows whether it goes on, so memory does not grow with the program.
+    """
+    moves, turn = 0, None  # The open run of moves or turns, if the last piece ended in one
+    for chunk in chunks:
+        if not chunk:
+            continue
+        start = 0
+        if moves and chunk[0] != "M":
+            dig = chunk[0] == "D"
+            yield (MOVE, moves, dig)
+            moves, start = 0, int(dig)
+        elif turn is not None and chunk[0] not in "LR":
+            if turn % 4:
+                yield (TURN, turn % 4)
+            turn = None
+
+        for match in _TOKENS.finditer(chunk, start):
+            run, dig, turns = match.groups()
+            is_open = match.end() == len(chunk)
+            if run:
+                moves += len(run)
+                if dig or not is_open:
+                    yield (MOVE, moves, bool(dig))
+                    moves = 0
+            else:
+                turn = (turn or 0) + turns.count("R") - turns.count("L")
+                if not is_open:
+                    if turn % 4:
+                        yield (TURN, turn % 4)
+                    turn = None
+
+    if moves:
+        yield (MOVE, moves, False)
+    elif turn is not None and turn % 4:
+        yield (TURN, turn % 4)
+
+
+class MineIndex:
+    """Mine positions per line of a map: "first mine along this straight run" lookups by bisection.
+
+    Each row's mine columns and each column's mine rows are read from the
+    packed grid the first time a rover runs along that line, then kept
+    sorted and shared by every rover. Nothing is built up front, and only
+    the lines rovers use take memory, one int per mine on them.
+    """
+
+    def __init__(self, map_data):
+        self.grid = map_data if isinstance(map_data, MineGrid) else MineGrid(map_data)
+        self.rows, self.cols = self.grid.rows, self.grid.cols
+        self.row_mines = {}  # x -> sorted y of the mines in row x
+        self.col_mines = {}  # y -> sorted x of the mines in column y
+
+    def _line(self, x, y, direction):
+        """Return the sorted mine positions along the line through (x, y) and (x, y)'s place on it."""
+        if direction in (EAST, WEST):
+            line = self.row_mines.get(x)
+            if line is None:
+                line = self.row_mines[x] = [col for col, value in enumerate(self.grid.row_values(x)) if value]
+            return line, y
+        line = self.col_mines.get(y)
+        if line is None:
+            grid = self.grid
+            mask = 1 << (y & 7)
+            column = grid.bits[y >> 3::grid.stride]  # One byte per row holds column y's bit
+            line = self.col_mines[y] = [row for row, bits in enumerate(column) if bits & mask]
+        return line, x
+
+    def set_mine(self, x, y, mine):
+        """Place or clear the mine at (x, y), updating only its row and column."""
+        self.grid.set_mine(x, y, mine)
+        for line, position in ((self.row_mines.get(x), y), (self.col_mines.get(y), x)):
+            if line is None:
+                continue  # Not read yet, so it will be read from the updated grid
+            at = bisect_left(line, position)
+            present = at < len(line) and line[at] == position
+            if mine and not present:
+                line.insert(at, position)
+            elif not mine and present:
+                del line[at]
+
+    def to_edge(self, x, y, direction):
+        """Return how many steps a rover at (x, y) can move before the edge."""
+        return (x, self.cols - 1 - y, self.rows - 1 - x, y)[direction]
+
+    def first_mine(self, x, y, direction, limit, dug=()):
+        """Return the steps to the first mine within `limit` steps that is not in `dug`, or None."""
+        dx, dy = DIRECTIONS[direction]
+        line, position = self._line(x, y, direction)
+        if dx > 0 or dy > 0:
+            ahead = range(bisect_right(line, position), len(line))
+        else:
+            ahead = range(bisect_left(line, position) - 1, -1, -1)
+        for at in ahead:
+            distance = abs(line[at] - position)
+            if distance > limit:
+                return None
+            if (x + dx * distance, y + dy * distance) not in dug:
+                return distance
+        return None
+
+
+def trace_path(commands, grid, mine_index=None, on_dig=None, on_explode=None, track=None):
+    """Run calculate_path on compiled commands and return the rover's RoverTrack.
+
+    Iterating the track yields the same rows as calculate_path's path grid.
+    Each run of moves costs one bisection, plus a step per mine the rover
+    has already dug along it, however long the run is. Digs go into the track rather than
+    the shared grid; on_dig(x, y) and on_explode(x, y) report them.
+
+    `commands` is a string or an iterable of its pieces, as stream_path takes.
+    Pass a SparseTrack as `track` to keep only the rows the rover entered.
+    """
+    mine_index = mine_index or MineIndex(grid)
+    if track is None:
+        track = RoverTrack(mine_index.grid)
+    deque(stream_path(commands, grid, mine_index, on_dig, on_explode, track), maxlen=0)
+    return track
+
+
+def stream_path(commands, grid, mine_index=None, on_dig=None, on_explode=None, track=None):
+    """Run calculate_path like trace_path, yielding each straight run as the rover finishes it.
+
+    Yields (x, y, direction, steps): the rover left (x, y) and went `steps`
+    cells in `direction`. `commands` may be an iterator of string pieces,
+    e.g. command_fetcher.stream_moves(...), which is read only as far as the
+    rover gets, so a program of millions of commands is simulated and its
+    path emitted in constant memory. The visited cells go into `track`, a
+    SparseTrack unless one is given.
+    """
+    mine_index = mine_index or MineIndex(grid)
+    if track is None:
+        track = SparseTrack(mine_index.grid)
+    track.visit(0, 0)  # Starting position
+    visit_run = track.visit_run
+    x, y = 0, 0
+    direction = SOUTH
+
+    for op in compile_stream([commands] if isinstance(commands, str) else commands):
+        if op[0] == TURN:
+            direction = (direction + op[1]) % 4
+            continue
+
+        _, count, dig = op
+        dx, dy = DIRECTIONS[direction]
+        steps = min(count, mine_index.to_edge(x, y, direction))
+        hit = mine_index.first_mine(x, y, direction, steps, track.dug)
+
+        end_x, end_y = x + dx * steps, y + dy * steps
+        if hit is None and steps < count and track.is_mine(end_x, end_y):
+            # Moves past the edge re-check the cell the rover stands on, which is
+            # only an active mine if the rover never left its starting cell
+            hit = steps + 1
+
+        if hit is None:
+            visit_run(x, y, dx, dy, steps)
+            yield x, y, direction, steps
+            x, y = end_x, end_y
+            continue
+
+        mine_x, mine_y = x + dx * min(hit, steps), y + dy * min(hit, steps)
+        if hit == count and dig:
+            visit_run(x, y, dx, dy, min(hit, steps))
+            track.dig(mine_x, mine_y)
+            if on_dig:
+                on_dig(mine_x, mine_y)
+            yield x, y, direction, min(hit, steps)
+            x, y = mine_x, mine_y
+            track.visit(x, y)
+        else:
+            visit_run(x, y, dx, dy, min(hit - 1, steps))
+            yield x, y, direction, min(hit - 1, steps)
+            track.explode(mine_x, mine_y)
+            if on_explode:
+                on_explode(mine_x, mine_y)
+            return
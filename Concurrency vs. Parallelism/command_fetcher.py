@@ -0,0 +1,333 @@
+import asyncio
+import itertools
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://coe892.reev.dev/lab1/rover"
+CONCURRENCY = 16  # Requests in flight at once, and so the most connections kept open
+RETRIES = 3
+BACKOFF = 0.2  # Seconds before the first retry, doubled for each one after
+TIMEOUT = 10
+STREAM_CHUNK = 64 * 1024  # Bytes read at a time when a program is streamed
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HEDGE_PERCENTILE = 95  # A hedge goes out once a call is slower than this share of recent calls
+HEDGE_DELAY = 0.25  # Seconds to wait before hedging until there are HEDGE_SAMPLES latencies
+HEDGE_SAMPLES = 20
+BUDGET_RATIO = 0.1  # Retries and hedges allowed per request, on top of BUDGET_RESERVE
+BUDGET_RESERVE = 10
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+class RetryBudget:
+    """Caps retries and hedges at a share of the requests made, so a slow or failing API is not hit harder.
+
+    Every request earns `ratio` tokens and every retry or hedge spends one,
+    starting from `reserve` tokens, so there are never more than
+    reserve + ratio * requests retries and hedges in all.
+    """
+
+    def __init__(self, ratio=BUDGET_RATIO, reserve=BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.tokens = float(reserve)
+
+    def deposit(self):
+        self.tokens += self.ratio
+
+    def withdraw(self):
+        """Spend a token for a retry or hedge; False when the budget is used up."""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class LatencyStats:
+    """Latencies of the most recent calls plus counts of retries and hedges, for tuning."""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self.budget_exhausted = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, percent):
+        """Return the given percentile of the recent latencies in seconds, or None with no samples."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def summary(self):
+        latencies = " ".join(f"p{percent}={self.percentile(percent) * 1000:.1f}ms" for percent in (50, 95, 99, 100)
+                             if self.samples) or "no latencies"
+        return (f"{self.calls} calls, {latencies}, {self.retries} retries, "
+                f"{self.hedges} hedges ({self.hedges_won} won), budget exhausted {self.budget_exhausted} times")
+
+
+class CommandFetcher:
+    """Fetches rover programs with requests over a pool of keep-alive connections.
+
+    Every thread gets its own requests.Session, all mounted on one
+    HTTPAdapter, so they share a pool of at most `concurrency` connections
+    (twice that with hedging) and a batch pays for that many handshakes
+    instead of one per rover. Redirects and 1xx answers are handled by
+    requests. Connection errors, timeouts and 5xx/429 answers are retried
+    with jittered exponential backoff.
+
+    With hedge=True a second copy of a request goes out once the first has
+    taken longer than the recent p95 latency, and whichever answers first
+    is used; the other finishes in the background and returns its
+    connection to the pool. Retries and hedges both draw on one
+    RetryBudget, and every call's latency goes into `stats`.
+
+    fetch() blocks the calling thread. fetch_many() and the async methods
+    run fetch() on the fetcher's `concurrency` threads. Close the fetcher,
+    or use it in a with block, to close its connections and threads.
+    """
+
+    def __init__(self, base_url=API_URL, concurrency=CONCURRENCY, retries=RETRIES, backoff=BACKOFF, timeout=TIMEOUT,
+                 hedge=False, budget=None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.hedge = hedge
+        self.budget = budget or RetryBudget()
+        self.stats = LatencyStats()
+
+        attempts = concurrency * (2 if hedge else 1)  # A hedge may run beside every call
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=attempts, pool_block=True)
+        self._local = threading.local()  # Each thread's Session
+        self._calls = ThreadPoolExecutor(max_workers=concurrency)  # fetch_many and the async methods
+        self._attempts = ThreadPoolExecutor(max_workers=attempts) if hedge else None
+        self._lock = threading.Lock()  # Guards budget and stats, which every thread updates
+
+    def _session(self):
+        """Return this thread's Session, on the fetcher's shared connection pool."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+        return session
+
+    def _timed(self, url):
+        """Send one GET and record how long it took."""
+        start_time = time.perf_counter()
+        response = self._session().get(url, timeout=self.timeout)
+        with self._lock:
+            self.stats.record(time.perf_counter() - start_time)
+        return response
+
+    def _spend(self, counter):
+        """Withdraw a budget token for a retry or hedge and count it in stats; False when the budget is used up."""
+        with self._lock:
+            if not self.budget.withdraw():
+                self.stats.budget_exhausted += 1
+                return False
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+            return True
+
+    def hedge_delay(self):
+        """Return how long a call runs before it is hedged: the recent p95, or HEDGE_DELAY with too few samples."""
+        if len(self.stats.samples) < HEDGE_SAMPLES:
+            return HEDGE_DELAY
+        return self.stats.percentile(HEDGE_PERCENTILE)
+
+    def _hedged(self, url):
+        """Send a GET, and a second copy if the first is slow; the first successful answer wins."""
+        primary = self._attempts.submit(self._timed, url)
+        try:
+            return primary.result(timeout=self.hedge_delay())
+        except FutureTimeout:
+            pass
+        if not self._spend("hedges"):
+            return primary.result()
+
+        backup = self._attempts.submit(self._timed, url)
+        pending = {primary, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self.stats.hedges_won += 1
+                    return future.result()
+        return primary.result()  # Both failed: raise the first request's error
+
+    def fetch(self, rover_id):
+        """Return the requests.Response for one rover, retrying failures with backoff while the budget allows."""
+        url = f"{self.base_url}/{rover_id}"
+        with self._lock:
+            self.stats.calls += 1
+            self.budget.deposit()
+
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                if not self._spend("retries"):
+                    break
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (0.5 + random.random()))
+            try:
+                response = self._hedged(url) if self.hedge else self._timed(url)
+                error = None
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+            except requests.RequestException as e:
+                error = e
+        if error is not None:
+            raise error
+        return response
+
+    def fetch_many(self, rover_ids):
+        """Return {rover_id: Response} for every rover, fetched concurrently."""
+        rover_ids = list(rover_ids)
+        return dict(zip(rover_ids, self._calls.map(self.fetch, rover_ids)))
+
+    async def fetch_async(self, rover_id):
+        """fetch() on one of the fetcher's threads, so an event loop can await many at once."""
+        return await asyncio.get_running_loop().run_in_executor(self._calls, self.fetch, rover_id)
+
+    async def fetch_many_async(self, rover_ids):
+        """Return {rover_id: Response} for every rover, fetched concurrently on the event loop."""
+        rover_ids = list(rover_ids)
+        responses = await asyncio.gather(*(self.fetch_async(rover_id) for rover_id in rover_ids))
+        return dict(zip(rover_ids, responses))
+
+    def close(self):
+        """Close the pooled connections and stop the fetcher's threads."""
+        self._calls.shutdown()
+        if self._attempts is not None:
+            self._attempts.shutdown()
+        self._adapter.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def default_fetcher():
+    """Return the process-wide fetcher for the lab API, creating it on first use."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = CommandFetcher()
+        return _default_fetcher
+
+
+def set_default_fetcher(fetcher):
+    """Make `fetcher` the process-wide fetcher, e.g. one with hedging on."""
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = fetcher
+
+
+def iter_moves(body):
+    """Yield the "moves" string of an API answer in pieces, given the answer's body as an iterable of bytes.
+
+    Only the bytes up to the key and the piece being yielded are held, so
+    a program of any length streams in constant memory. Yields nothing if
+    the answer has no moves. Moves are plain letters, so escapes are not
+    decoded.
+    """
+    key = b'"moves"'
+    chunks = iter(body)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        start = head.find(key)
+        if start >= 0:
+            break
+        head = head[-(len(key) - 1):]  # The key may start at the end of this piece
+    else:
+        return
+
+    head = head[start + len(key):]
+    while b'"' not in head:  # Past the colon to the value's opening quote
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        head += chunk
+
+    for piece in itertools.chain([head[head.index(b'"') + 1:]], chunks):
+        end = piece.find(b'"')
+        if end >= 0:
+            if end:
+                yield piece[:end].decode("ascii")
+            return
+        if piece:
+            yield piece.decode("ascii")
+
+
+def stream_moves(rover_id, base_url=API_URL, chunk_size=STREAM_CHUNK, timeout=TIMEOUT):
+    """Yield one rover's program in pieces as it downloads, for command_compiler.stream_path.
+
+    For programs too long to hold as a string, e.g. millions of commands
+    sent with a chunked body. Each stream has a connection of its own
+    rather than one from a CommandFetcher's pool, and an HTTP error raises
+    requests.HTTPError.
+    """
+    with requests.get(f"{base_url.rstrip('/')}/{rover_id}", stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        yield from iter_moves(response.iter_content(chunk_size))
+
+
+def main():
+    """Fetch rover programs from a local stub with a slow tail, in batches of ten like the labs.
+
+    Runs one connection per request, then pooled fetch_many with and without
+    hedging, and prints how long the batches took and the fetcher's stats.
+    python command_fetcher.py [count] [typical latency] [slow latency] [slow share]
+    """
+    import stub_api  # Only the benchmark needs the local stub
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    typical = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    slow = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    probability = float(sys.argv[4]) if len(sys.argv) > 4 else 0.02
+    base_url, server = stub_api.serve_stub(latency=stub_api.tail_latency(typical, slow, probability))
+    batches = [range(start, min(start + 10, count + 1)) for start in range(1, count + 1, 10)]
+
+    start_time = time.perf_counter()
+    for rover_id in range(1, count + 1):
+        requests.get(f"{base_url}/{rover_id}").content
+    print(f"{count} rovers, one connection each: {time.perf_counter() - start_time:.2f} seconds")
+
+    for hedge in (False, True):
+        with CommandFetcher(base_url, hedge=hedge) as fetcher:
+            batch_times = LatencyStats()
+            for batch in batches:
+                start_time = time.perf_counter()
+                responses = fetcher.fetch_many(batch)
+                batch_times.record(time.perf_counter() - start_time)
+                assert all(response.ok for response in responses.values())
+            print(f"{count} rovers, fetch_many in batches of 10{', hedged' if hedge else ''}: "
+                  f"{sum(batch_times.samples):.2f} seconds, batch p50={batch_times.percentile(50) * 1000:.1f}ms "
+                  f"p95={batch_times.percentile(95) * 1000:.1f}ms")
+            print(f"  {fetcher.stats.summary()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
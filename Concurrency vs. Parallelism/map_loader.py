@@ -0,0 +1,76 @@
+import mmap
+import os
+import struct
+import sys
+
+# Binary maps: magic, rows, cols, then one byte (0 or 1) per cell, row by row
+MAGIC = b"RMAP"
+HEADER = struct.Struct("<4sII")
+
+# Text cells to binary ones: "1" is a mine, any other cell character (0, or
+# the X a disarmed mine is marked with) is clear
+_CELLS = bytes(1 if value == ord("1") else 0 for value in range(256))
+_WHITESPACE = b" \t\r\n"
+
+
+def parse_text_map(data):
+    """Parse map.txt bytes ("rows cols" line, then space separated cells) into (rows, cols, cells).
+
+    The cells are parsed in one pass over the whole body instead of line by
+    line: whitespace is dropped and every remaining character becomes one
+    0/1 byte, so cells[x * cols + y] is the cell at (x, y).
+    """
+    header, _, body = data.partition(b"\n")
+    rows, cols = map(int, header.split())
+    cells = body.translate(_CELLS, _WHITESPACE)
+    if len(cells) != rows * cols:
+        raise ValueError(f"Map should have {rows}x{cols} cells, found {len(cells)}")
+    return rows, cols, cells
+
+
+def write_binary_map(file_name, rows, cols, cells):
+    with open(file_name, "wb") as file:
+        file.write(HEADER.pack(MAGIC, rows, cols))
+        file.write(cells)
+
+
+def open_binary_map(file_name):
+    """Map a binary map into memory and return (rows, cols, cells) without copying the cells."""
+    with open(file_name, "rb") as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, rows, cols = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{file_name} is not a binary map")
+    return rows, cols, memoryview(data)[HEADER.size:HEADER.size + rows * cols]
+
+
+def binary_path(file_name):
+    """Return where the binary copy of a text map lives: map.txt -> map.bin."""
+    return os.path.splitext(file_name)[0] + ".bin"
+
+
+def load_map(file_name):
+    """Return (rows, cols, cells) for a map file.
+
+    A binary copy next to the text map is memory-mapped when it was written
+    after the text map last changed; otherwise the text map is parsed.
+    """
+    binary = binary_path(file_name)
+    if binary != file_name and os.path.exists(binary) \
+            and os.stat(binary).st_mtime_ns > os.stat(file_name).st_mtime_ns:
+        return open_binary_map(binary)
+    with open(file_name, "rb") as file:
+        return parse_text_map(file.read())
+
+
+def main():
+    """Convert a text map to its binary copy: python map_loader.py [map.txt]"""
+    file_name = sys.argv[1] if len(sys.argv) > 1 else "map.txt"
+    with open(file_name, "rb") as file:
+        rows, cols, cells = parse_text_map(file.read())
+    write_binary_map(binary_path(file_name), rows, cols, cells)
+    print(f"Wrote {rows}x{cols} map to {binary_path(file_name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,32 @@
-import requests
+import sys
 import time
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import result_cache
+import rover_batch
+from mine_grid import MineGrid, RoverTrack
+
+SIMULATOR = "part1_sequential.calculate_path/1"  # Bump when calculate_path's results change
 
 # Read the map
 def read_map(filename):
-    with open(filename, 'r') as file:
-        rows, cols = map(int, file.readline().split())
-        map_data = [list(map(int, line.split())) for line in file]
-    return rows, cols, map_data
+    rows, cols, cells = map_loader.load_map(filename)  # map.bin is memory-mapped when it is current
+    return rows, cols, MineGrid.from_cells(rows, cols, cells)
 
-# Get rover commands from the API
-def get_rover_commands(rover_id):
-    url = f"https://coe892.reev.dev/lab1/rover/{rover_id}"
-    response = requests.get(url)
-    return response.text.strip()
+# Get every rover's commands from the API at once, over pooled keep-alive connections
+def get_rover_commands(rover_ids):
+    with phase_trace.span("fetch"):
+        responses = command_fetcher.default_fetcher().fetch_many(rover_ids)
+    return {rover_id: response.text.strip() for rover_id, response in responses.items()}
 
 # Calculate the path of the rover
-def calculate_path(commands, map_data):
+def calculate_path(commands, grid):
     x, y = 0, 0
     direction = 'S'  # Initial direction is South
-    path = [[cell for cell in row] for row in map_data]  # Copy the map data
-    path[x][y] = '*'  # Starting position
+    path = RoverTrack(grid)  # Digs and visited cells on top of the shared map
+    path.visit(x, y)  # Starting position
 
     i = 0
     while i < len(commands):
@@ -46,32 +53,32 @@ def calculate_path(commands, map_data):
         elif cmd == 'M':
             # Calculate the next position
             next_x, next_y = x, y
-            if direction == 'S' and x < len(map_data) - 1:
+            if direction == 'S' and x < grid.rows - 1:
                 next_x += 1
             elif direction == 'N' and x > 0:
                 next_x -= 1
-            elif direction == 'E' and y < len(map_data[0]) - 1:
+            elif direction == 'E' and y < grid.cols - 1:
                 next_y += 1
             elif direction == 'W' and y > 0:
                 next_y -= 1
 
             # Check if the next position is a mine
-            if map_data[next_x][next_y] == 1:
+            if path.is_mine(next_x, next_y):
                 # Check if the next command is a dig (D)
                 if i + 1 < len(commands) and commands[i + 1] == 'D':
                     # Dig the mine and move
-                    map_data[next_x][next_y] = 0  # Dig the mine
+                    path.dig(next_x, next_y)  # Dig the mine
                     i += 1  # Skip the next command (D)
                     print(f"Rover dug a mine at ({next_x}, {next_y})")
                 else:
                     # Rover explodes
-                    path[next_x][next_y] = 'X'
+                    path.explode(next_x, next_y)
                     print(f"Rover exploded at ({next_x}, {next_y})")
                     break  # Stop processing further commands
 
             # Move to the next position
             x, y = next_x, next_y
-            path[x][y] = '*'  # Mark the path
+            path.visit(x, y)  # Mark the path
             print(f"Rover moved to ({x}, {y})")
 
         elif cmd == 'D':
@@ -82,22 +89,57 @@ def calculate_path(commands, map_data):
 
     return path
 
-# Write the path to a file
-def write_path_to_file(path, rover_id):
-    with open(f"path_{rover_id}.txt", 'w') as file:
-        for row in path:
-            file.write(' '.join([str(cell) for cell in row]) + '\n')
+# Write the path to a file, unless the file already holds this result
+def write_path_to_file(result, rover_id, writer, key):
+    with phase_trace.span("write", rover_id):
+        result_cache.write_cached(writer, result_cache.default_cache(), rover_id, key, result)  # Rendered in bulk
+
+# Simulate rovers one at a time with calculate_path
+def simulate_each(grid, rover_commands):
+    results = {}
+    for rover_id, commands in rover_commands.items():
+        with phase_trace.span("simulate", rover_id):
+            results[rover_id] = result_cache.SimResult.from_track(calculate_path(commands, grid))
+    return results
+
+# Simulate every rover at once with the NumPy batch engine, one command step for all of them per array operation
+def simulate_batch(grid, rover_commands):
+    with phase_trace.span("simulate"):
+        results = rover_batch.simulate_results(list(rover_commands.values()), rover_batch.grid_values(grid))
+    return dict(zip(rover_commands, results))
+
+# Simulation engines selectable per run, both giving calculate_path's results
+ENGINES = {
+    "scalar": simulate_each,
+    "batch": simulate_batch,
+}
 
 # Sequential processing
-def sequential_processing():
-    rows, cols, map_data = read_map('map.txt')
+def sequential_processing(output=path_writer.TEXT, engine="scalar"):
+    rows, cols, grid = read_map('map.txt')  # Bit-packed map shared read-only by every rover
+    writer = path_writer.PathWriter(output)  # text, rle or archive
+    cache = result_cache.default_cache()  # Results of earlier runs with the same map and commands
+    inputs = result_cache.inputs_digest(grid)
     start_time = time.time()
+    rover_commands = get_rover_commands(range(1, 11))
+    keys = {rover_id: result_cache.result_key(SIMULATOR, inputs, commands) for rover_id, commands in rover_commands.items()}
+    results = {rover_id: cache.get(key) for rover_id, key in keys.items()}
+    pending = {}
+    for rover_id, result in results.items():
+        if result is None:
+            print(f"Processing Rover {rover_id} with commands: {rover_commands[rover_id]}")
+            pending[rover_id] = rover_commands[rover_id]
+        else:
+            print(f"Rover {rover_id} is unchanged since an earlier run, using its cached path")
+    for rover_id, result in ENGINES[engine](grid, pending).items():
+        cache.put(keys[rover_id], result)
+        results[rover_id] = result
     for rover_id in range(1, 11):
-        commands = get_rover_commands(rover_id)
-        print(f"Processing Rover {rover_id} with commands: {commands}")
-        path = calculate_path(commands, [row[:] for row in map_data])
-        write_path_to_file(path, rover_id)
+        write_path_to_file(results[rover_id], rover_id, writer, keys[rover_id])
+    writer.close()
     end_time = time.time()
     print(f"Sequential processing time: {end_time - start_time} seconds")
+    phase_trace.default_tracer().report("part1_sequential")  # Where the time went, per phase
 
-sequential_processing()
\ No newline at end of file
+# Path output and simulation engine from the command line: text (default), rle or archive, then scalar (default) or batch
+sequential_processing(sys.argv[1] if len(sys.argv) > 1 else path_writer.TEXT, sys.argv[2] if len(sys.argv) > 2 else "scalar")
\ No newline at end of file
@@ -1,116 +1,78 @@
-import requests
+import sys
 import time
 import threading
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import result_cache
+from command_compiler import TRACE_VERSION, MineIndex, trace_path
+from mine_grid import MineGrid
+
+SIMULATOR = f"trace_path/{TRACE_VERSION}"
 
 # Read the map
 def read_map(filename):
-    with open(filename, 'r') as file:
-        rows, cols = map(int, file.readline().split())
-        map_data = [list(map(int, line.split())) for line in file]
-    return rows, cols, map_data
+    rows, cols, cells = map_loader.load_map(filename)  # map.bin is memory-mapped when it is current
+    return rows, cols, MineGrid.from_cells(rows, cols, cells)
 
-# Get rover commands from the API
+# Get rover commands from the API; rovers share the fetcher's keep-alive connections
 def get_rover_commands(rover_id):
-    url = f"https://coe892.reev.dev/lab1/rover/{rover_id}"
-    response = requests.get(url)
+    with phase_trace.span("fetch", rover_id):
+        response = command_fetcher.default_fetcher().fetch(rover_id)
     return response.text.strip()
 
 # Calculate the path of the rover
-def calculate_path(commands, map_data):
-    x, y = 0, 0
-    direction = 'S'  # Initial direction is South
-    path = [[cell for cell in row] for row in map_data]  # Copy the map data
-    path[x][y] = '*'  # Starting position
-
-    i = 0
-    while i < len(commands):
-        cmd = commands[i]
-
-        if cmd == 'L':
-            if direction == 'S':
-                direction = 'E'
-            elif direction == 'E':
-                direction = 'N'
-            elif direction == 'N':
-                direction = 'W'
-            elif direction == 'W':
-                direction = 'S'
-        elif cmd == 'R':
-            if direction == 'S':
-                direction = 'W'
-            elif direction == 'W':
-                direction = 'N'
-            elif direction == 'N':
-                direction = 'E'
-            elif direction == 'E':
-                direction = 'S'
-        elif cmd == 'M':
-            # Calculate the next position
-            next_x, next_y = x, y
-            if direction == 'S' and x < len(map_data) - 1:
-                next_x += 1
-            elif direction == 'N' and x > 0:
-                next_x -= 1
-            elif direction == 'E' and y < len(map_data[0]) - 1:
-                next_y += 1
-            elif direction == 'W' and y > 0:
-                next_y -= 1
-
-            # Check if the next position is a mine
-            if map_data[next_x][next_y] == 1:
-                # Check if the next command is a dig (D)
-                if i + 1 < len(commands) and commands[i + 1] == 'D':
-                    # Dig the mine and move
-                    map_data[next_x][next_y] = 0  # Dig the mine
-                    i += 1  # Skip the next command (D)
-                else:
-                    # Rover explodes
-                    path[next_x][next_y] = 'X'
-                    break  # Stop processing further commands
-
-            # Move to the next position
-            x, y = next_x, next_y
-            path[x][y] = '*'  # Mark the path
-
-        elif cmd == 'D':
-            # Dig command is handled in the 'M' case
-            pass
-
-        i += 1
-
-    return path
-
-# Write the path to a file (thread-safe)
-def write_path_to_file(path, rover_id, lock):
-    with lock:
-        with open(f"path_{rover_id}.txt", 'w') as file:
-            for row in path:
-                file.write(' '.join([str(cell) for cell in row]) + '\n')
-
-# Thread function to process a rover
-def process_rover(rover_id, map_data, lock):
+def calculate_path(commands, grid, mine_index=None):
+    # Runs of moves are simulated in one step each, see command_compiler; the
+    # returned track iterates as the path grid
+    return trace_path(commands, grid, mine_index)
+
+# Write the path to a file unless it already holds this result; every rover has its own file, so no lock is needed
+def write_path_to_file(result, rover_id, writer, key):
+    with phase_trace.span("write", rover_id):
+        result_cache.write_cached(writer, result_cache.default_cache(), rover_id, key, result)  # Rendered in bulk
+
+# Thread function to process a rover; rovers unchanged since an earlier run come from the result cache
+def process_rover(rover_id, grid, writer, mine_index=None, inputs=None):
     commands = get_rover_commands(rover_id)
-    print(f"Processing Rover {rover_id} with commands: {commands}")
-    path = calculate_path(commands, [row[:] for row in map_data])
-    write_path_to_file(path, rover_id, lock)
+    cache = result_cache.default_cache()
+    key = result_cache.result_key(SIMULATOR, inputs or result_cache.inputs_digest(grid), commands)
+    result = cache.get(key)
+    if result is None:
+        print(f"Processing Rover {rover_id} with commands: {commands}")
+        with phase_trace.span("simulate", rover_id):
+            result = result_cache.SimResult.from_track(calculate_path(commands, grid, mine_index))
+        cache.put(key, result)
+    else:
+        print(f"Rover {rover_id} is unchanged since an earlier run, using its cached path")
+    write_path_to_file(result, rover_id, writer, key)
 
 # Parallel processing using threading
-def parallel_processing():
-    rows, cols, map_data = read_map('map.txt')
-    lock = threading.Lock()  # Lock for thread-safe file writing
+def parallel_processing(output=path_writer.TEXT, hedge=False):
+    if hedge:
+        # Duplicate slow requests, so one slow rover does not hold up the join below
+        command_fetcher.set_default_fetcher(command_fetcher.CommandFetcher(hedge=True))
+    rows, cols, grid = read_map('map.txt')  # Bit-packed map shared read-only by every rover
+    mine_index = MineIndex(grid)  # Mine lines shared by every rover
+    writer = path_writer.PathWriter(output)  # text, rle or archive
+    inputs = result_cache.inputs_digest(grid)  # Map digest, part of every rover's result cache key
     threads = []
 
     start_time = time.time()
     for rover_id in range(1, 11):
-        thread = threading.Thread(target=process_rover, args=(rover_id, map_data, lock))
+        thread = threading.Thread(target=process_rover, args=(rover_id, grid, writer, mine_index, inputs))
         threads.append(thread)
         thread.start()
 
     # Wait for all threads to finish
     for thread in threads:
         thread.join()
+    writer.close()
 
     end_time = time.time()
     print(f"Parallel processing time: {end_time - start_time} seconds")
+    print(f"Command fetches: {command_fetcher.default_fetcher().stats.summary()}")
+    phase_trace.default_tracer().report("part1_threading")  # Where the time went, per phase
 
-parallel_processing()
\ No newline at end of file
+parallel_processing(sys.argv[1] if len(sys.argv) > 1 else path_writer.TEXT, "hedge" in sys.argv[2:])
\ No newline at end of file
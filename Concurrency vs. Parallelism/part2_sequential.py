@@ -1,126 +1,100 @@
-import requests
+import sys
 import time
-import hashlib
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import pin_cache
+import pin_solver
+import result_cache
+from command_compiler import TRACE_VERSION, MineIndex, trace_path
+from mine_grid import MineGrid
+
+SIMULATOR = f"trace_path/{TRACE_VERSION}"
 
 # Read the map
 def read_map(filename):
-    with open(filename, 'r') as file:
-        rows, cols = map(int, file.readline().split())
-        map_data = [list(map(int, line.split())) for line in file]
-    return rows, cols, map_data
+    rows, cols, cells = map_loader.load_map(filename)  # map.bin is memory-mapped when it is current
+    return rows, cols, MineGrid.from_cells(rows, cols, cells)
 
 # Read mines from the file
 def read_mines(filename):
     with open(filename, 'r') as file:
         return [line.strip() for line in file]
 
-# Get rover commands from the API
-def get_rover_commands(rover_id):
-    url = f"https://coe892.reev.dev/lab1/rover/{rover_id}"
-    response = requests.get(url)
-    return response.text.strip()
+# Get every rover's commands from the API at once, over pooled keep-alive connections
+def get_rover_commands(rover_ids):
+    with phase_trace.span("fetch"):
+        responses = command_fetcher.default_fetcher().fetch_many(rover_ids)
+    return {rover_id: response.text.strip() for rover_id, response in responses.items()}
 
 # Brute-force to find a valid PIN for a mine
-def find_valid_pin(serial_number):
-    pin = 0  # Start with PIN = 0
-    while True:
-        temporary_mine_key = serial_number + str(pin)  # Concatenate serial number and PIN
-        hash_value = hashlib.sha256(temporary_mine_key.encode()).hexdigest()  # Compute SHA-256 hash
-
-        # Check if the hash has at least six leading zeros
-        if hash_value.startswith('000000'):
-            return pin  # Valid PIN found
-
-        pin += 1  # Increment PIN and try again
+def find_valid_pin(serial_number, difficulty=pin_solver.DIFFICULTY):
+    # Keys are serial number + PIN, the hash needs `difficulty` leading zeros; PINs solved before come from the cache
+    with phase_trace.span("find_valid_pin", serial=serial_number):
+        return pin_cache.default_cache().get_or_solve(serial_number, difficulty, pin_solver.SERIAL_PIN,
+                                                      pin_solver.find_valid_pin)
+
+# Find a dug mine's PIN and report it
+def disarm_mine(x, y, grid, mines):
+    mine_serial = mines[x * grid.cols + y]  # Get mine serial number
+    pin = find_valid_pin(mine_serial)  # Find valid PIN
+    print(f"Rover dug mine at ({x}, {y}) with PIN: {pin}")
 
 # Calculate the path of the rover and dig mines
-def calculate_path(commands, map_data, mines):
-    x, y = 0, 0
-    direction = 'S'  # Initial direction is South
-    path = [[cell for cell in row] for row in map_data]  # Copy the map data
-    path[x][y] = '*'  # Starting position
-
-    i = 0
-    while i < len(commands):
-        cmd = commands[i]
-
-        if cmd == 'L':
-            if direction == 'S':
-                direction = 'E'
-            elif direction == 'E':
-                direction = 'N'
-            elif direction == 'N':
-                direction = 'W'
-            elif direction == 'W':
-                direction = 'S'
-        elif cmd == 'R':
-            if direction == 'S':
-                direction = 'W'
-            elif direction == 'W':
-                direction = 'N'
-            elif direction == 'N':
-                direction = 'E'
-            elif direction == 'E':
-                direction = 'S'
-        elif cmd == 'M':
-            # Calculate the next position
-            next_x, next_y = x, y
-            if direction == 'S' and x < len(map_data) - 1:
-                next_x += 1
-            elif direction == 'N' and x > 0:
-                next_x -= 1
-            elif direction == 'E' and y < len(map_data[0]) - 1:
-                next_y += 1
-            elif direction == 'W' and y > 0:
-                next_y -= 1
-
-            # Check if the next position is a mine
-            if map_data[next_x][next_y] == 1:
-                # Check if the next command is a dig (D)
-                if i + 1 < len(commands) and commands[i + 1] == 'D':
-                    # Dig the mine and move
-                    mine_serial = mines[next_x * len(map_data[0]) + next_y]  # Get mine serial number
-                    pin = find_valid_pin(mine_serial)  # Find valid PIN
-                    print(f"Rover dug mine at ({next_x}, {next_y}) with PIN: {pin}")
-                    map_data[next_x][next_y] = 0  # Dig the mine
-                    i += 1  # Skip the next command (D)
-                else:
-                    # Rover explodes
-                    path[next_x][next_y] = 'X'
-                    print(f"Rover exploded at ({next_x}, {next_y})")
-                    break  # Stop processing further commands
-
-            # Move to the next position
-            x, y = next_x, next_y
-            path[x][y] = '*'  # Mark the path
+def calculate_path(commands, grid, mines, mine_index=None):
+    dug = []
 
-        elif cmd == 'D':
-            # Dig command is handled in the 'M' case
-            pass
+    def dig_mine(x, y):
+        dug.append((x, y))
+        disarm_mine(x, y, grid, mines)
 
-        i += 1
+    def explode(x, y):
+        print(f"Rover exploded at ({x}, {y})")
 
-    return path
+    # Runs of moves are simulated in one step each, see command_compiler; the
+    # result holds the path grid and the digs in order for the result cache.
+    # The simulate span includes the find_valid_pin spans of the mines dug
+    track = trace_path(commands, grid, mine_index, on_dig=dig_mine, on_explode=explode)
+    return result_cache.SimResult.from_track(track, dug)
 
-# Write the path to a file
-def write_path_to_file(path, rover_id):
-    with open(f"path_{rover_id}.txt", 'w') as file:
-        for row in path:
-            file.write(' '.join([str(cell) for cell in row]) + '\n')
+# Write the path to a file, unless the file already holds this result
+def write_path_to_file(path, rover_id, writer, key):
+    with phase_trace.span("write", rover_id):
+        result_cache.write_cached(writer, result_cache.default_cache(), rover_id, key, path)  # Rendered in bulk
 
 # Sequential processing
-def sequential_processing():
-    rows, cols, map_data = read_map('map.txt')
+def sequential_processing(output=path_writer.TEXT):
+    rows, cols, grid = read_map('map.txt')  # Bit-packed map shared read-only by every rover
     mines = read_mines('mines.txt')  # Read mines from the file
+    mine_index = MineIndex(grid)  # Mine lines shared by every rover
+    writer = path_writer.PathWriter(output)  # text, rle or archive
+    cache = result_cache.default_cache()  # Results of earlier runs with the same map, mines and commands
+    inputs = result_cache.inputs_digest(grid, mines)
     start_time = time.time()
+    rover_commands = get_rover_commands(range(1, 11))
 
     for rover_id in range(1, 11):
-        commands = get_rover_commands(rover_id)
-        print(f"Processing Rover {rover_id} with commands: {commands}")
-        path = calculate_path(commands, [row[:] for row in map_data], mines)
-        write_path_to_file(path, rover_id)
+        commands = rover_commands[rover_id]
+        key = result_cache.result_key(SIMULATOR, inputs, commands)
+        path = cache.get(key)
+        if path is None:
+            print(f"Processing Rover {rover_id} with commands: {commands}")
+            with phase_trace.span("simulate", rover_id):
+                path = calculate_path(commands, grid, mines, mine_index)
+            cache.put(key, path)
+        else:
+            # Not simulated again; the digs are reported from the cached result, their PINs from the PIN cache
+            print(f"Rover {rover_id} is unchanged since an earlier run, using its cached path")
+            for x, y in path.dug:
+                disarm_mine(x, y, grid, mines)
+            if path.exploded is not None:
+                print(f"Rover exploded at {path.exploded}")
+        write_path_to_file(path, rover_id, writer, key)
+    writer.close()
 
     end_time = time.time()
     print(f"Sequential processing time: {end_time - start_time} seconds")
+    phase_trace.default_tracer().report("part2_sequential")  # Where the time went, per phase
 
-sequential_processing()
\ No newline at end of file
+sequential_processing(sys.argv[1] if len(sys.argv) > 1 else path_writer.TEXT)
\ No newline at end of file
@@ -1,17 +1,24 @@
 import time
-import requests
-import hashlib
+import sys
 import threading
-from copy import deepcopy
+from concurrent.futures import ThreadPoolExecutor
+
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import pin_cache
+import pin_solver
+import result_cache
+from mine_grid import MineGrid, RoverTrack
+
+SIMULATOR = "part2_threading.execute_commands/1"  # Bump when execute_commands' paths change
 
 
 def read_map(file_name):
-    """Read the map.txt file and return the map as a 2D list."""
-    with open(file_name, "r") as file:
-        lines = file.readlines()
-        rows, cols = map(int, lines[0].strip().split())
-        grid = [list(map(int, line.strip().split())) for line in lines[1:]]
-    return grid, rows, cols
+    """Read the map.txt file and return the map bit-packed as a MineGrid."""
+    rows, cols, cells = map_loader.load_map(file_name)  # map.bin is memory-mapped when it is current
+    return MineGrid.from_cells(rows, cols, cells), rows, cols
 
 
 def read_mines(file_name):
@@ -23,8 +30,7 @@ def read_mines(file_name):
 def fetch_rover_commands(rover_id):
     """Fetch rover commands from the API."""
     try:
-        url = f"https://coe892.reev.dev/lab1/rover/{rover_id}"
-        response = requests.get(url)
+        response = command_fetcher.default_fetcher().fetch(rover_id)  # Pooled keep-alive connections
         if response.status_code == 200:
             result = response.json()
             if result.get("result"):
@@ -40,26 +46,49 @@ def fetch_rover_commands(rover_id):
         return ""
 
 
-def find_valid_pin(serial_number):
-    """Find a valid PIN by brute-forcing with SHA256."""
-    pin = 0
-    while True:
-        # Concatenate PIN and serial number
-        key = f"{pin}{serial_number}"
-        hashed_key = hashlib.sha256(key.encode()).hexdigest()
-        if hashed_key.startswith("000000"):  # Check for 6 leading zeros
-            return pin
-        pin += 1
+def find_valid_pin_worker(serial_number, difficulty=pin_solver.DIFFICULTY, layout=pin_solver.PIN_SERIAL):
+    """Find the lowest valid PIN with one hash loop in a worker process.
+
+    SHA-256 on short keys holds the GIL, so hashing on the solver threads
+    would still run the solves one at a time.
+    """
+    pool, _ = pin_solver.get_process_pool()
+    return pool.submit(pin_solver.find_valid_pin, serial_number, difficulty, layout).result()
+
+
+# PIN solvers selectable per run: each PIN on one worker process, or each PIN split across all of them
+PIN_SOLVERS = {
+    "worker": find_valid_pin_worker,
+    "process": pin_solver.find_valid_pin_parallel,
+}
+PIN_THREADS = 16  # Solves in flight at once, whichever rover dug the mine; the threads only wait on the process pool
+
+
+def find_valid_pin(serial_number, solver="worker", difficulty=pin_solver.DIFFICULTY):
+    """Find a valid PIN by brute-forcing SHA256 over PIN + serial number, reusing cached PINs."""
+    with phase_trace.span("find_valid_pin", serial=serial_number):
+        return pin_cache.default_cache().get_or_solve(serial_number, difficulty, pin_solver.PIN_SERIAL,
+                                                      PIN_SOLVERS[solver])
 
 
-def execute_commands(rover_id, commands, grid, rows, cols, mine_serials, serials_lock):
-    """Execute commands for the rover and update its path on the map."""
+def execute_commands(rover_id, commands, track, rows, cols, mine_serials, serials_lock, writer, pin_pool, solver="worker"):
+    """Execute commands for the rover and record its digs and path in its track.
+
+    A dug mine's PIN is submitted to pin_pool and the rover moves on; the
+    PINs are only waited for once the path is written, so a rover takes as
+    long as its slowest PIN or its moves, not the sum of every PIN.
+
+    Returns the dug mines in order, or None if the rover stopped because the
+    serial numbers ran out, which depends on the other rovers.
+    """
+    start_ns = time.perf_counter_ns()  # Start of the simulate span
+    disarmed = []  # (report line, PIN future) of every mine disarmed so far
+    dug = []
     # Initial position and direction
     x, y = 0, 0  # Top-left corner
     direction = 2  # 0: North, 1: East, 2: South, 3: West
     directions = [(-1, 0), (0, 1), (1, 0), (0, -1)]  # N, E, S, W
-    path_grid = [["0" for _ in range(cols)] for _ in range(rows)]
-    path_grid[x][y] = "*"  # Mark the starting position
+    track.visit(x, y)  # Mark the starting position
 
     for command in commands:
         if command == "L":
@@ -77,69 +106,119 @@ def execute_commands(rover_id, commands, grid, rows, cols, mine_serials, serials
             # Check if the new position is within bounds
             if 0 <= new_x < rows and 0 <= new_y < cols:
                 # Check for a mine
-                if grid[new_x][new_y] == 1:
+                if track.is_mine(new_x, new_y):
                     print(f"Rover {rover_id} encountered a mine at ({new_x}, {new_y})!")
-                    with serials_lock:
+                    with phase_trace.locked(serials_lock, "serials_lock", rover_id):  # Records the wait for it
                         if mine_serials:
                             serial_number = mine_serials.pop(0)  # Safely get the next serial number
                         else:
                             print(f"Rover {rover_id} cannot disarm the mine at ({new_x}, {new_y}) due to missing serial numbers.")
+                            dug = None
                             break
 
-                    pin = find_valid_pin(serial_number)
-                    print(f"Rover {rover_id} disarmed the mine at ({new_x}, {new_y}) with PIN: {pin}")
-                    grid[new_x][new_y] = 0  # Mark the mine as disarmed
+                    pin = pin_pool.submit(find_valid_pin, serial_number, solver)
+                    disarmed.append((f"Rover {rover_id} disarmed the mine at ({new_x}, {new_y})", pin))
+                    track.dig(new_x, new_y)  # Mark the mine as disarmed
+                    dug.append((new_x, new_y))
                     x, y = new_x, new_y  # Update position after disarming
-                    path_grid[x][y] = "*"  # Mark the cell as visited
+                    track.visit(x, y)  # Mark the cell as visited
                 else:
                     # Update position
                     x, y = new_x, new_y
-                    path_grid[x][y] = "*"  # Mark the cell as visited
+                    track.visit(x, y)  # Mark the cell as visited
             else:
                 # Ignore the move if it's out of bounds
                 print(f"Rover {rover_id} cannot move out of bounds to ({new_x}, {new_y}).")
                 continue
         elif command == "D":
             # Dig at the current position
-            if grid[x][y] == 1:
+            if track.is_mine(x, y):
                 print(f"Rover {rover_id} dug and disarmed the mine at ({x}, {y})!")
-                with serials_lock:
+                with phase_trace.locked(serials_lock, "serials_lock", rover_id):
                     if mine_serials:
                         serial_number = mine_serials.pop(0)  # Safely get the next serial number
                     else:
                         print(f"Rover {rover_id} cannot disarm the mine at ({x}, {y}) due to missing serial numbers.")
+                        dug = None
                         break
 
-                pin = find_valid_pin(serial_number)
-                print(f"Rover {rover_id} disarmed the mine with PIN: {pin}")
-                grid[x][y] = 0  # Mark the mine as disarmed
+                pin = pin_pool.submit(find_valid_pin, serial_number, solver)
+                disarmed.append((f"Rover {rover_id} disarmed the mine", pin))
+                track.dig(x, y)  # Mark the mine as disarmed
+                dug.append((x, y))
             else:
                 print(f"Rover {rover_id} attempted to dig at ({x}, {y}), but no mine was present.")
 
-    # Save the path grid to a file
-    with open(f"path_{rover_id}.txt", "w") as file:
-        for row in path_grid:
-            file.write(" ".join(row) + "\n")
-
-
-def process_rover(rover_id, original_grid, rows, cols, mine_serials, serials_lock):
-    """Fetch commands and process a single rover."""
-    grid = deepcopy(original_grid)  # Create a deep copy of the grid for the rover
-    commands = fetch_rover_commands(rover_id)
-    if commands:
-        print(f"Processing Rover {rover_id} with commands: {commands}")
-        execute_commands(rover_id, commands, grid, rows, cols, mine_serials, serials_lock)
-    else:
+    # Save the path grid to a file, rendered in bulk, then report the PINs as they come in
+    phase_trace.record("simulate", start_ns, rover_id)
+    with phase_trace.span("write", rover_id):
+        writer.write(rover_id, path_writer.visited_cells(track), rows, cols)
+    with phase_trace.span("pin wait", rover_id):
+        for report, pin in disarmed:
+            print(f"{report} with PIN: {pin.result()}")
+    return dug
+
+
+def take_serials(rover_id, count, mine_serials, serials_lock):
+    """Take the next `count` serial numbers, or none and return None if there are fewer left."""
+    with phase_trace.locked(serials_lock, "serials_lock", rover_id):
+        if len(mine_serials) < count:
+            return None
+        serials = mine_serials[:count]
+        del mine_serials[:count]
+        return serials
+
+
+def process_rover(rover_id, original_grid, rows, cols, mine_serials, serials_lock, writer, pin_pool, solver="worker",
+                  inputs=None):
+    """Fetch commands and process a single rover, or replay its result from an earlier run if it is unchanged."""
+    with phase_trace.span("fetch", rover_id):
+        commands = fetch_rover_commands(rover_id)
+    if not commands:
         print(f"No commands available for Rover {rover_id}")
+        return
+
+    cache = result_cache.default_cache()
+    key = result_cache.result_key(SIMULATOR, inputs or result_cache.inputs_digest(original_grid), commands)
+    result = cache.get(key)
+    # A cached rover still takes a serial number per mine it dug; without enough left it runs for real
+    serials = result and take_serials(rover_id, len(result.dug), mine_serials, serials_lock)
+    if serials is None:
+        print(f"Processing Rover {rover_id} with commands: {commands}")
+        track = RoverTrack(original_grid)  # The rover's digs and path, the map itself is shared
+        dug = execute_commands(rover_id, commands, track, rows, cols, mine_serials, serials_lock, writer, pin_pool,
+                               solver)
+        if dug is not None:
+            cache.put(key, result_cache.SimResult.from_track(track, dug, path_writer.visited_cells(track)))
+            cache.mark_written(rover_id, writer.mode, key, writer.file_name(rover_id))
+        return
+
+    print(f"Rover {rover_id} is unchanged since an earlier run, using its cached path")
+    pins = [pin_pool.submit(find_valid_pin, serial_number, solver) for serial_number in serials]
+    with phase_trace.span("write", rover_id):
+        result_cache.write_cached(writer, cache, rover_id, key, result)
+    with phase_trace.span("pin wait", rover_id):
+        for (x, y), pin in zip(result.dug, pins):
+            print(f"Rover {rover_id} disarmed the mine at ({x}, {y}) with PIN: {pin.result()}")
 
 
 def main():
+    # PIN solver and path output from the command line: worker (default) or process, text (default), rle or archive
+    solver = sys.argv[1] if len(sys.argv) > 1 else "worker"
+    output = sys.argv[2] if len(sys.argv) > 2 else path_writer.TEXT
+    if solver not in PIN_SOLVERS or output not in path_writer.MODES:
+        print(f"Usage: python part2_threading.py [{'|'.join(PIN_SOLVERS)}] [{'|'.join(path_writer.MODES)}]")
+        return
+
     # Read the original map
-    original_grid, rows, cols = read_map("map.txt")
+    original_grid, rows, cols = read_map("map.txt")  # Bit-packed, shared read-only by every rover
 
     # Read the mine serial numbers
     mine_serials = read_mines("mines.txt")
+    inputs = result_cache.inputs_digest(original_grid, mine_serials)  # Part of every rover's result cache key
     serials_lock = threading.Lock()  # Lock for safely accessing serials
+    writer = path_writer.PathWriter(output)  # Each rover writes its own file, no lock needed
+    pin_pool = ThreadPoolExecutor(max_workers=PIN_THREADS)  # Rovers keep moving while their PINs are solved
 
     # Start timing
     start_time = time.time()
@@ -147,17 +226,20 @@ def main():
     # Create and start threads for each rover
     threads = []
     for rover_id in range(1, 11):
-        thread = threading.Thread(target=process_rover, args=(rover_id, original_grid, rows, cols, mine_serials, serials_lock))
+        thread = threading.Thread(target=process_rover, args=(rover_id, original_grid, rows, cols, mine_serials, serials_lock, writer, pin_pool, solver, inputs))
         threads.append(thread)
         thread.start()
 
     # Wait for all threads to finish
     for thread in threads:
         thread.join()
+    writer.close()
+    pin_pool.shutdown()
 
     # End timing
     end_time = time.time()
     print(f"Threaded execution time: {end_time - start_time:.2f} seconds")
+    phase_trace.default_tracer().report("part2_threading")  # Where the time went, per phase
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+import re
+import struct
+import threading
+import zipfile
+
+TEXT, RLE, ARCHIVE = "text", "rle", "archive"
+MODES = (TEXT, RLE, ARCHIVE)
+ARCHIVE_NAME = "paths.zip"
+
+# Binary paths: magic, rows, cols, then runs of (cell character, count) row by row
+MAGIC = b"RPTH"
+HEADER = struct.Struct("<4sII")
+RUN = struct.Struct("<cI")
+_RUNS = re.compile(rb"(.)\1*", re.DOTALL)
+
+# Bits of every byte value, lowest bit first, one byte per bit
+_SPREAD = [bytes((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+# Cell codes (mine bit + 2 * visited bit) to the characters of each path format
+_PATH_CELLS = bytes.maketrans(b"\x00\x01\x02\x03", b"01**")
+_VISITED_CELLS = bytes.maketrans(b"\x00\x01", b"0*")
+
+
+def _spread(bits, grid):
+    """Unpack a bitset laid out like the grid into one byte (0 or 1) per cell."""
+    spread = b"".join(map(_SPREAD.__getitem__, bits))
+    width = grid.stride * 8
+    if width == grid.cols:
+        return spread
+    return b"".join(spread[x * width:x * width + grid.cols] for x in range(grid.rows))
+
+
+def track_cells(track):
+    """Return a RoverTrack's calculate_path grid, one character per cell: map value, '*' or 'X'."""
+    grid = track.grid
+    mines = int.from_bytes(_spread(grid.bits, grid), "little")
+    visited = int.from_bytes(_spread(track.visited, grid), "little")
+    # Every byte of the sum is its cell's code, so one translate renders the grid
+    cells = bytearray((mines + 2 * visited).to_bytes(grid.rows * grid.cols, "little").translate(_PATH_CELLS))
+    if track.exploded is not None:
+        x, y = track.exploded
+        cells[x * grid.cols + y] = ord("X")
+    return bytes(cells)
+
+
+def visited_cells(track):
+    """Return a RoverTrack's execute_commands grid, one character per cell: '*' or '0'."""
+    return _spread(track.visited, track.grid).translate(_VISITED_CELLS)
+
+
+def grid_cells(path):
+    """Return a path grid given as rows of single character cells, one character per cell."""
+    return "".join(str(cell) for row in path for cell in row).encode("ascii")
+
+
+def render_text(cells, rows, cols):
+    """Render cells as path_<id>.txt has them: cells separated by spaces, one row per line."""
+    count = rows * cols
+    if not count:
+        return b"\n" * rows
+    text = bytearray(2 * count)
+    text[0::2] = cells
+    text[1::2] = b" " * count
+    text[2 * cols - 1::2 * cols] = b"\n" * rows  # The separator after each row's last cell
+    return bytes(text)
+
+
+def encode_rle(cells, rows, cols):
+    """Encode cells in the binary run-length format."""
+    runs = (RUN.pack(match.group(1), len(match.group())) for match in _RUNS.finditer(cells))
+    return HEADER.pack(MAGIC, rows, cols) + b"".join(runs)
+
+
+def decode_rle(data):
+    """Decode the binary run-length format into (rows, cols, cells)."""
+    magic, rows, cols = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary path")
+    cells = b"".join(cell * count for cell, count in RUN.iter_unpack(data[HEADER.size:]))
+    return rows, cols, cells
+
+
+def read_archive(file_name=ARCHIVE_NAME):
+    """Return {rover_id: (rows, cols, cells)} for every path in a run's archive."""
+    paths = {}
+    with zipfile.ZipFile(file_name) as archive:
+        for name in archive.namelist():
+            rover_id = int(name[len("path_"):-len(".rle")])
+            paths[rover_id] = decode_rle(archive.read(name))
+    return paths
+
+
+class PathWriter:
+    """Writes rover paths as path_<id>.txt, path_<id>.rle or entries of one archive for the run.
+
+    Paths are rendered in the calling thread and every rover has its own
+    file, so rovers write in parallel. Only the archive's append of an
+    already encoded entry is serialized.
+    """
+
+    def __init__(self, mode=TEXT, archive_name=ARCHIVE_NAME):
+        if mode not in MODES:
+            raise ValueError(f"Unknown path output mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self._archive = zipfile.ZipFile(archive_name, "w") if mode == ARCHIVE else None
+        self._archive_lock = threading.Lock()
+
+    def file_name(self, rover_id):
+        """Return the file a rover's path is written to, or None in archive mode."""
+        if self.mode == ARCHIVE:
+            return None
+        return f"path_{rover_id}.{'txt' if self.mode == TEXT else 'rle'}"
+
+    def write(self, rover_id, cells, rows, cols):
+        """Write one rover's path given as one character per cell."""
+        if self.mode == TEXT:
+            # Text mode, so lines end the way the platform's text files do
+            with open(self.file_name(rover_id), "w") as file:
+                file.write(render_text(cells, rows, cols).decode("ascii"))
+        elif self.mode == RLE:
+            with open(self.file_name(rover_id), "wb") as file:
+                file.write(encode_rle(cells, rows, cols))
+        else:
+            data = encode_rle(cells, rows, cols)
+            with self._archive_lock:
+                self._archive.writestr(f"path_{rover_id}.rle", data)
+
+    def write_track(self, rover_id, track):
+        """Write a RoverTrack as its calculate_path grid."""
+        self.write(rover_id, track_cells(track), track.grid.rows, track.grid.cols)
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
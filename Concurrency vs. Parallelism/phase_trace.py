@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_default_tracer = None
+_default_lock = threading.Lock()
+
+
+def _percentile(ordered, percent):
+    """Return the given percentile of an ascending list, picked the way command_fetcher.LatencyStats does."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class PhaseTracer:
+    """Timed spans of a run's phases (fetch, simulate, find_valid_pin, lock waits, writes) per rover.
+
+    Spans are stored as Chrome trace "complete" events, with the process
+    that ran them and a track: the rover's, or the thread's for spans of no
+    rover. Rovers sharing a thread, like asyncio tasks on one loop, so get a
+    row each instead of overlapping. write() gives a file chrome://tracing
+    and Perfetto open as is and summary() gives p50/p95 per phase. Timestamps
+    come from the monotonic clock, which worker processes share on one host:
+    a worker's spans can be drain()ed, sent back with its result and added
+    to the parent's tracer with extend().
+    """
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def record(self, phase, start_ns, rover_id=None, **args):
+        """Add a span of `phase` that started at time.perf_counter_ns() value start_ns and ends now."""
+        end_ns = time.perf_counter_ns()
+        if rover_id is not None:
+            args["rover"] = rover_id
+        track = f"thread {threading.get_native_id()}" if rover_id is None else f"rover {rover_id}"
+        event = {"name": phase, "cat": "rover", "ph": "X", "ts": start_ns / 1000, "dur": (end_ns - start_ns) / 1000,
+                 "pid": os.getpid(), "tid": track, "args": args}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, phase, rover_id=None, **args):
+        """Time the body of a with block as one span of `phase`."""
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(phase, start_ns, rover_id, **args)
+
+    @contextmanager
+    def locked(self, lock, phase, rover_id=None):
+        """Hold `lock` for the body of a with block, recording the wait to acquire it as a span of `phase`."""
+        with self.span(phase, rover_id):
+            lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def drain(self):
+        """Return the spans recorded so far and forget them."""
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        with self._lock:
+            self.events.extend(events)
+
+    def write(self, file_name, label):
+        """Write the spans as Chrome trace JSON, naming every process after the run and every track after its rover.
+
+        Tracks get numeric tids in order, rovers by id first, then threads.
+        """
+        def order(key):
+            pid, track = key
+            kind, _, number = track.partition(" ")
+            return pid, kind != "rover", int(number)
+
+        tracks = sorted({(event["pid"], event["tid"]) for event in self.events}, key=order)
+        tids = {key: tid for tid, key in enumerate(tracks, 1)}
+        names = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{label} ({pid})"}}
+                 for pid in sorted({event["pid"] for event in self.events})]
+        names += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tids[pid, track], "args": {"name": track}}
+                  for pid, track in tracks]
+        events = [dict(event, tid=tids[event["pid"], event["tid"]]) for event in self.events]
+        with open(file_name, "w") as file:
+            json.dump({"traceEvents": names + events, "displayTimeUnit": "ms"}, file)
+
+    def summary(self, label):
+        """Return a text table of span count, p50, p95 and total milliseconds per phase."""
+        phases = {}
+        for event in self.events:
+            phases.setdefault(event["name"], []).append(event["dur"] / 1000)
+        lines = [f"Phase timings for {label}:"]
+        for phase, durations in phases.items():
+            durations.sort()
+            lines.append(f"  {phase:>16}: {len(durations):6} spans, p50 {_percentile(durations, 50):9.2f} ms, "
+                         f"p95 {_percentile(durations, 95):9.2f} ms, total {sum(durations):10.2f} ms")
+        return "\n".join(lines)
+
+    def report(self, label, file_name=None):
+        """Write the trace to trace_<label>.json (or file_name) and print the summary."""
+        file_name = file_name or f"trace_{label}.json"
+        self.write(file_name, label)
+        print(self.summary(label))
+        print(f"Trace written to {file_name}, open it in chrome://tracing or ui.perfetto.dev")
+
+
+def default_tracer():
+    """Return the process-wide tracer the lab scripts record into, creating it on first use."""
+    global _default_tracer
+    with _default_lock:
+        if _default_tracer is None:
+            _default_tracer = PhaseTracer()
+        return _default_tracer
+
+
+def span(phase, rover_id=None, **args):
+    return default_tracer().span(phase, rover_id, **args)
+
+
+def record(phase, start_ns, rover_id=None, **args):
+    default_tracer().record(phase, start_ns, rover_id, **args)
+
+
+def locked(lock, phase, rover_id=None):
+    return default_tracer().locked(lock, phase, rover_id)
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pin_solver
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Fixed serial corpora, so runs are comparable across commits
+CORPORA = {
+    "RabbitMQ": os.path.join(BASE_DIR, "..", "RabbitMQ", "mines.txt"),
+    "gRPC": os.path.join(BASE_DIR, "..", "gRPC", "mines.txt"),
+}
+DIFFICULTIES = (3, 4, 5)
+
+KERNEL_SERIAL = "b1l3qy2l9g"
+KERNEL_HASHES = 300000
+KERNEL_START = 1000000  # Seven digit PINs, the length most six-zero hits have
+UNREACHABLE = 64  # Every nibble zero: no PIN matches, so the whole range is hashed
+
+
+def read_corpus(file_name):
+    """Read serial numbers from a mines.txt file: bare serials, or "row col serial" lines."""
+    with open(file_name, "r") as file:
+        return [line.split()[-1] for line in file if line.strip()]
+
+
+def measure_kernel(backend, count=KERNEL_HASHES):
+    """Hash `count` PIN candidates with a range backend and return hashes per second."""
+    search = pin_solver.BACKENDS[backend]
+    start_time = time.perf_counter()
+    search(KERNEL_SERIAL, KERNEL_START, KERNEL_START + count, UNREACHABLE, pin_solver.PIN_SERIAL)
+    return count / (time.perf_counter() - start_time)
+
+
+def make_solvers(workers):
+    """Return every solver under test, each called as solve(serial_number, difficulty)."""
+    threads = ThreadPoolExecutor(max_workers=workers)
+    return {
+        "sequential": pin_solver.find_valid_pin,
+        "threads": partial(pin_solver.find_valid_pin_parallel, workers=workers, pool=threads),
+        "processes": partial(pin_solver.find_valid_pin_parallel, workers=workers),
+        "vectorized": partial(pin_solver.find_valid_pin, backend="numpy"),
+    }
+
+
+def run_solver(solve, serials, difficulty):
+    """Solve every serial and return (hashes/sec, PINs/sec, seconds per mine).
+
+    Hashes count the candidates up to and including the lowest valid PIN,
+    which is the work a sequential search does, whatever the solver spent.
+    """
+    hashes = 0
+    start_time = time.perf_counter()
+    for serial_number in serials:
+        hashes += solve(serial_number, difficulty) + 1
+    elapsed = time.perf_counter() - start_time
+    return hashes / elapsed, len(serials) / elapsed, elapsed / len(serials)
+
+
+def main():
+    difficulties = [int(arg) for arg in sys.argv[1:]] or DIFFICULTIES
+    workers = os.cpu_count() or 1
+
+    print(f"Kernel throughput, {KERNEL_HASHES} candidates on one core:")
+    for backend in pin_solver.BACKENDS:
+        try:
+            print(f"  {backend:>10}: {measure_kernel(backend):12,.0f} hashes/sec")
+        except ImportError as e:
+            print(f"  {backend:>10}: skipped ({e})")
+
+    solvers = make_solvers(workers)
+    for name, solve in list(solvers.items()):
+        try:
+            solve(KERNEL_SERIAL, 1)  # Warm up pools and imports outside the timings
+        except ImportError as e:
+            print(f"Skipping {name} solver ({e})")
+            del solvers[name]
+
+    print(f"\nSolvers with {workers} workers:")
+    print(f"  {'corpus':<9} {'diff':>4} {'solver':>10} {'hashes/sec':>14} {'PINs/sec':>10} {'sec/mine':>10}")
+    for corpus, file_name in CORPORA.items():
+        serials = read_corpus(file_name)
+        for difficulty in difficulties:
+            for name, solve in solvers.items():
+                hash_rate, pin_rate, per_mine = run_solver(solve, serials, difficulty)
+                print(f"  {corpus:<9} {difficulty:>4} {name:>10} {hash_rate:14,.0f} {pin_rate:10.2f} {per_mine:10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from hashlib import sha256
+
+DIFFICULTY = 6  # Leading zero hex digits a valid PIN's hash must have
+CHUNK_SIZE = 1 << 15  # PINs handed to a backend (or worker process) at a time
+BLOCK = 1000  # PINs sharing one midstate (all but the last three digits)
+
+# Key layouts: the labs disagree on whether the PIN goes before or after the serial
+PIN_SERIAL = "pin+serial"
+SERIAL_PIN = "serial+pin"
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _key_parts(serial_number, layout):
+    """Return the constant bytes before and after the PIN for a key layout."""
+    serial = serial_number.encode()
+    if layout == PIN_SERIAL:
+        return b"", serial
+    if layout == SERIAL_PIN:
+        return serial, b""
+    raise ValueError(f"Unknown key layout: {layout}")
+
+
+@lru_cache(maxsize=32)
+def _block_suffixes(tail):
+    """Return the zero-padded last three PIN digits followed by the key tail, for every offset in a block."""
+    return [b"%03d%s" % (low, tail) for low in range(BLOCK)]
+
+
+def search_pin_range(serial_number, start, stop, difficulty=DIFFICULTY, layout=PIN_SERIAL):
+    """Return the lowest valid PIN in [start, stop), or None if the range has none.
+
+    Every PIN from BLOCK up shares its leading digits with BLOCK - 1 others, so
+    those digits (plus the serial for serial+pin keys) are hashed once and each
+    candidate only copies that midstate and feeds in its last three digits.
+    Digests are checked for leading zero nibbles as raw bytes, no hex strings.
+    """
+    head, tail = _key_parts(serial_number, layout)
+    zero_bytes, odd = divmod(difficulty, 2)
+    zeros = bytes(zero_bytes)
+
+    pin = start
+    while pin < stop:
+        high, low = divmod(pin, BLOCK)
+        end = min(stop, (high + 1) * BLOCK)
+
+        if high == 0:
+            # PINs below BLOCK have no leading digits to share
+            for candidate in range(pin, end):
+                digest = sha256(b"%s%d%s" % (head, candidate, tail)).digest()
+                if digest[:zero_bytes] == zeros and (not odd or digest[zero_bytes] < 16):
+                    return candidate
+        else:
+            copy_midstate = sha256(b"%s%d" % (head, high)).copy
+            for offset, suffix in enumerate(_block_suffixes(tail)[low:end - high * BLOCK]):
+                hashed_key = copy_midstate()
+                hashed_key.update(suffix)
+                digest = hashed_key.digest()
+                if digest[:zero_bytes] == zeros and (not odd or digest[zero_bytes] < 16):
+                    return pin + offset
+
+        pin = end
+    return None
+
+
+def search_pin_range_numpy(serial_number, start, stop, difficulty=DIFFICULTY, layout=PIN_SERIAL):
+    """Same as search_pin_range, but hashes whole batches of PINs per NumPy call."""
+    import sha256_numpy  # NumPy is only needed when this backend is picked
+
+    head, tail = _key_parts(serial_number, layout)
+    return sha256_numpy.first_valid_pin(head, tail, start, stop, difficulty)
+
+
+# Range searchers selectable by name: scalar hashlib loop or vectorized NumPy SHA-256
+BACKENDS = {
+    "hashlib": search_pin_range,
+    "numpy": search_pin_range_numpy,
+}
+
+
+def find_valid_pin(serial_number, difficulty=DIFFICULTY, layout=PIN_SERIAL, backend="hashlib"):
+    """Find the lowest valid PIN for a serial number on the calling thread."""
+    return search_pin_chunks(serial_number, 0, None, difficulty, layout, backend)
+
+
+def search_pin_chunks(serial_number, start, stop=None, difficulty=DIFFICULTY, layout=PIN_SERIAL, backend="hashlib",
+                      cancelled=None, checkpoint=None):
+    """Return the lowest valid PIN in [start, stop), searching a chunk at a time.
+
+    With stop=None the search runs until it hits. Between chunks it gives up
+    and returns None once cancelled() is true. After every chunk without a
+    hit, checkpoint(next_start) gets the PIN to resume from; passing that back
+    in as `start` continues the same search.
+    """
+    search = BACKENDS[backend]
+    while (stop is None or start < stop) and (cancelled is None or not cancelled()):
+        end = start + CHUNK_SIZE if stop is None else min(stop, start + CHUNK_SIZE)
+        pin = search(serial_number, start, end, difficulty, layout)
+        if pin is not None:
+            return pin
+        start = end
+        if checkpoint is not None:
+            checkpoint(start)
+    return None
+
+
+def get_process_pool(workers=None):
+    """Return the process pool shared by every caller, creating it on first use.
+
+    Workers are spawned rather than forked, so the pool is safe to start from
+    a thread of an already running gRPC server.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = workers or os.cpu_count() or 1
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool, _pool_workers
+
+
+def find_valid_pin_parallel(serial_number, difficulty=DIFFICULTY, layout=PIN_SERIAL, backend="hashlib",
+                            workers=None, chunk_size=CHUNK_SIZE, pool=None):
+    """Find a valid PIN by searching chunks of the PIN space on every core.
+
+    Chunks are handed out in order, so the PIN returned is the same one the
+    sequential search finds. Once a hit is known, queued chunks above it are
+    cancelled and only lower chunks still in flight are waited for.
+
+    Runs on the shared process pool unless another executor is passed as
+    `pool`, in which case `workers` must be its worker count.
+    """
+    search = BACKENDS[backend]
+    if pool is None:
+        pool, workers = get_process_pool(workers)
+    in_flight = {}  # future -> first PIN of its chunk
+    next_start = 0
+    best = None
+
+    while True:
+        # Keep every worker busy with one chunk and one queued behind it
+        while best is None and len(in_flight) < 2 * workers:
+            future = pool.submit(search, serial_number, next_start, next_start + chunk_size,
+                                 difficulty, layout)
+            in_flight[future] = next_start
+            next_start += chunk_size
+
+        if not in_flight:
+            return best
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            del in_flight[future]
+            pin = future.result()
+            if pin is not None and (best is None or pin < best):
+                best = pin
+
+        if best is not None:
+            # Chunks above the hit cannot hold a lower PIN, drop them
+            for future, start in list(in_flight.items()):
+                if start > best:
+                    future.cancel()
+                    del in_flight[future]
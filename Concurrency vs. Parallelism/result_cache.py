@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import path_writer
+
+CACHE_PATH = "result_cache.db"
+MAX_BYTES = 64 * 2**20  # Least recently used results beyond this many stored bytes are evicted
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+class SimResult:
+    """What simulating one rover produced: its path grid, where it exploded and the mines it dug in order."""
+
+    def __init__(self, rows, cols, cells, exploded=None, dug=()):
+        self.rows = rows
+        self.cols = cols
+        self.cells = cells  # One character per cell, as path_writer takes them
+        self.exploded = exploded
+        self.dug = list(dug)
+
+    @classmethod
+    def from_track(cls, track, dug=None, cells=None):
+        """Take a finished RoverTrack; `dug` gives the digs in order and `cells` another rendering of the path."""
+        grid = track.grid
+        if cells is None:
+            cells = path_writer.track_cells(track)
+        return cls(grid.rows, grid.cols, cells, track.exploded, sorted(track.dug) if dug is None else dug)
+
+
+def inputs_digest(grid, mines=()):
+    """Return a digest of a run's map and mine serial numbers, computed once per run."""
+    digest = hashlib.sha256(f"{grid.rows} {grid.cols}\n".encode("ascii"))
+    digest.update(bytes(grid.bits))
+    digest.update("\n".join(mines).encode())
+    return digest.hexdigest()
+
+
+def result_key(simulator, inputs, commands):
+    """Return the cache key of one rover: the simulator's name and version, the run's inputs and its program.
+
+    Bump the version in `simulator` whenever that simulator's results change.
+    """
+    digest = hashlib.sha256(f"{simulator}\0{inputs}\0".encode())
+    digest.update(commands.encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Rover results by result_key kept in SQLite, shared by every process on the host.
+
+    Works like pin_cache: WAL mode, a connection per thread and least
+    recently used eviction, here once the stored path grids (compressed)
+    add up to more than max_bytes. It also remembers which result each
+    rover's path file was last written from, with the file's size and
+    mtime then, so unchanged rovers skip writing it too unless something
+    else has written the file since.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, rows INTEGER NOT NULL, cols INTEGER NOT NULL, cells BLOB NOT NULL,"
+                " exploded TEXT, dug TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS written_files ("
+                " rover_id INTEGER NOT NULL, mode TEXT NOT NULL, key TEXT NOT NULL,"
+                " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, PRIMARY KEY (rover_id, mode))"
+            )
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Return the cached SimResult for a key, or None on a miss."""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT rows, cols, cells, exploded, dug FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        with connection:
+            connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+        rows, cols, cells, exploded, dug = row
+        return SimResult(rows, cols, zlib.decompress(cells), exploded and tuple(json.loads(exploded)),
+                         [tuple(cell) for cell in json.loads(dug)])
+
+    def put(self, key, result):
+        """Store a result and evict the least recently used ones past max_bytes."""
+        cells = zlib.compress(result.cells)
+        exploded = None if result.exploded is None else json.dumps(list(result.exploded))
+        dug = json.dumps([list(cell) for cell in result.dug])
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, rows, cols, cells, exploded, dug, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, result.rows, result.cols, cells, exploded, dug, len(cells) + len(dug), time.time()),
+            )
+            connection.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM"
+                " (SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total FROM results) WHERE total > ?)",
+                (self.max_bytes,),
+            )
+
+    def is_written(self, rover_id, mode, key, file_name):
+        """Return True if file_name still holds what mark_written recorded writing from `key` in `mode`."""
+        row = self._connection().execute(
+            "SELECT key, size, mtime_ns FROM written_files WHERE rover_id = ? AND mode = ?", (rover_id, mode)
+        ).fetchone()
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return False
+        return row == (key, stat.st_size, stat.st_mtime_ns)
+
+    def mark_written(self, rover_id, mode, key, file_name):
+        """Record that file_name, as it is now, was written from the result at `key`. A None file_name is ignored."""
+        if file_name is None:
+            return  # Archive entries, which are always written
+        stat = os.stat(file_name)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO written_files (rover_id, mode, key, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (rover_id, mode, key, stat.st_size, stat.st_mtime_ns),
+            )
+
+
+def write_cached(writer, cache, rover_id, key, result):
+    """Write a rover's path with a PathWriter unless its file already holds this result. Returns True if written.
+
+    A file another writer has touched since, e.g. rover_runner's grid over
+    part2_threading's, no longer matches its recorded size and mtime and is
+    written again. Archive entries are always written, since every run
+    starts a new archive.
+    """
+    file_name = writer.file_name(rover_id)
+    if file_name is not None and cache.is_written(rover_id, writer.mode, key, file_name):
+        return False
+    writer.write(rover_id, result.cells, result.rows, result.cols)
+    cache.mark_written(rover_id, writer.mode, key, file_name)
+    return True
+
+
+def default_cache():
+    """Return the process-wide cache at CACHE_PATH, opening it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
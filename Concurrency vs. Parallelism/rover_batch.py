@@ -0,0 +1,175 @@
+import sys
+import time
+
+import numpy as np
+
+import map_loader
+import path_writer
+import result_cache
+
+# Headings, turning right is +1: 0: North, 1: East, 2: South, 3: West
+DIRECTIONS = np.array([(-1, 0), (0, 1), (1, 0), (0, -1)])
+SOUTH = 2
+
+NOOP = ord(" ")  # Pads shorter command strings
+LEFT, RIGHT, MOVE, DIG = ord("L"), ord("R"), ord("M"), ord("D")
+
+
+class RoverBatch:
+    """N rovers replaying their command strings against one map, one command step at a time.
+
+    Follows calculate_path by default: rovers start at (0, 0) facing South,
+    moves past the edge leave the rover where it is, and moving onto a mine
+    digs it only if the next command is D, otherwise the rover explodes and
+    stops. With disarm_on_move it follows part2_threading's execute_commands
+    instead: moving onto a mine always disarms it and D disarms the current
+    cell. Each rover digs mines in its own overlay, so rovers never see each
+    other's digs.
+    """
+
+    def __init__(self, map_data, command_strings, disarm_on_move=False):
+        self.disarm_on_move = disarm_on_move
+        self.map_values = np.array(map_data)
+        self.mines = self.map_values == 1
+        rows, cols = self.mines.shape
+        count = len(command_strings)
+
+        # One extra padding column so the look-ahead for D never runs off the end
+        length = max(map(len, command_strings), default=0)
+        self.commands = np.full((count, length + 1), NOOP, dtype=np.uint8)
+        for rover, commands in enumerate(command_strings):
+            self.commands[rover, :len(commands)] = np.frombuffer(commands.encode(), dtype=np.uint8)
+
+        self.x = np.zeros(count, dtype=np.int64)
+        self.y = np.zeros(count, dtype=np.int64)
+        self.heading = np.full(count, SOUTH, dtype=np.int64)
+        self.alive = np.ones(count, dtype=bool)
+        self.dug = np.zeros((count, rows, cols), dtype=bool)
+        self.visited = np.zeros((count, rows, cols), dtype=bool)
+        self.visited[:, 0, 0] = True
+        self.exploded = np.full((count, 2), -1, dtype=np.int64)
+        self.digs = []  # (rover, x, y) in the order the mines were dug
+        self.step_index = 0
+
+    def step(self):
+        """Advance every live rover by one command."""
+        rows, cols = self.mines.shape
+        command = self.commands[:, self.step_index]
+        next_command = self.commands[:, self.step_index + 1]
+        active = self.alive & (command != NOOP)
+
+        self.heading[active & (command == LEFT)] -= 1
+        self.heading[active & (command == RIGHT)] += 1
+        self.heading %= 4
+
+        movers = np.flatnonzero(active & (command == MOVE))
+        if len(movers):
+            x, y = self.x[movers], self.y[movers]
+            dx, dy = DIRECTIONS[self.heading[movers]].T
+            next_x, next_y = x + dx, y + dy
+            inside = (next_x >= 0) & (next_x < rows) & (next_y >= 0) & (next_y < cols)
+            next_x, next_y = np.where(inside, next_x, x), np.where(inside, next_y, y)
+
+            mine = self.mines[next_x, next_y] & ~self.dug[movers, next_x, next_y]
+            if self.disarm_on_move:
+                dig = mine & inside
+                explode = np.zeros_like(mine)
+            else:
+                dig = mine & (next_command[movers] == DIG)
+                explode = mine & ~dig
+
+            self.dug[movers[dig], next_x[dig], next_y[dig]] = True
+            self.digs.extend(zip(movers[dig].tolist(), next_x[dig].tolist(), next_y[dig].tolist()))
+
+            self.alive[movers[explode]] = False
+            self.exploded[movers[explode]] = np.stack([next_x[explode], next_y[explode]], axis=1)
+
+            moved = ~explode
+            self.x[movers[moved]], self.y[movers[moved]] = next_x[moved], next_y[moved]
+            self.visited[movers[moved], next_x[moved], next_y[moved]] = True
+
+        if self.disarm_on_move:
+            diggers = np.flatnonzero(active & (command == DIG))
+            x, y = self.x[diggers], self.y[diggers]
+            dig = self.mines[x, y] & ~self.dug[diggers, x, y]
+            self.dug[diggers[dig], x[dig], y[dig]] = True
+            self.digs.extend(zip(diggers[dig].tolist(), x[dig].tolist(), y[dig].tolist()))
+
+        self.step_index += 1
+
+    def run(self):
+        """Run every command of every rover."""
+        while self.step_index < self.commands.shape[1] - 1 and self.alive.any():
+            self.step()
+        return self
+
+    def path_grid(self, rover):
+        """Return a rover's path as calculate_path does: map values, '*' where it went and 'X' where it exploded."""
+        grid = self.map_values.astype(object)
+        grid[self.visited[rover]] = "*"
+        if not self.alive[rover]:
+            x, y = self.exploded[rover]
+            grid[x, y] = "X"
+        return grid.tolist()
+
+    def visited_grid(self, rover):
+        """Return a rover's path as execute_commands does: "*" where it went, "0" elsewhere."""
+        return np.where(self.visited[rover], "*", "0").tolist()
+
+
+def grid_values(grid):
+    """Return a MineGrid's cells as a (rows, cols) array of 0/1, unpacked from its bits."""
+    bits = np.frombuffer(grid.bits, dtype=np.uint8).reshape(grid.rows, grid.stride)
+    return np.unpackbits(bits, axis=1, count=grid.cols, bitorder="little")
+
+
+def simulate_results(command_strings, map_data):
+    """Return the result_cache.SimResult calculate_path's track gives, for every command string."""
+    batch = RoverBatch(map_data, command_strings).run()
+    rows, cols = batch.mines.shape
+    digs = [[] for _ in command_strings]
+    for rover, x, y in batch.digs:
+        digs[rover].append((x, y))
+    return [result_cache.SimResult(rows, cols, path_writer.grid_cells(batch.path_grid(rover)),
+                                   None if batch.alive[rover] else tuple(batch.exploded[rover].tolist()),
+                                   sorted(digs[rover]))
+            for rover in range(len(command_strings))]
+
+
+def simulate_paths(command_strings, map_data):
+    """Return the calculate_path path grid for every command string."""
+    batch = RoverBatch(map_data, command_strings).run()
+    return [batch.path_grid(rover) for rover in range(len(command_strings))]
+
+
+def simulate_visited(command_strings, map_data):
+    """Return the execute_commands path grid and dug mines [(x, y), ...] for every command string."""
+    batch = RoverBatch(map_data, command_strings, disarm_on_move=True).run()
+    digs = [[] for _ in command_strings]
+    for rover, x, y in batch.digs:
+        digs[rover].append((x, y))
+    return [batch.visited_grid(rover) for rover in range(len(command_strings))], digs
+
+
+def main():
+    """Replay one command string per line of a file against map.txt and write path_<n>.txt files."""
+    if len(sys.argv) not in (2, 3):
+        print(f"Usage: python rover_batch.py <commands_file> [{'|'.join(path_writer.MODES)}]")
+        return
+
+    rows, cols, cells = map_loader.load_map("map.txt")
+    map_data = np.frombuffer(cells, dtype=np.uint8).reshape(rows, cols)  # A view of the loaded cells
+    with open(sys.argv[1], "r") as file:
+        command_strings = [line.strip() for line in file]
+
+    start_time = time.time()
+    paths = simulate_paths(command_strings, map_data)
+    writer = path_writer.PathWriter(sys.argv[2] if len(sys.argv) > 2 else path_writer.TEXT)
+    for rover_id, path in enumerate(paths, start=1):
+        writer.write(rover_id, path_writer.grid_cells(path), rows, cols)
+    writer.close()
+    print(f"Batch simulation of {len(paths)} rovers: {time.time() - start_time} seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import pin_cache
+import pin_solver
+import result_cache
+from command_compiler import TRACE_VERSION, MineIndex, trace_path
+from mine_grid import MineGrid
+
+SIMULATOR = f"trace_path/{TRACE_VERSION}"
+
+# Per-stage concurrency: rovers each stage works on at once
+FETCH_WORKERS = 16
+SIMULATE_WORKERS = 1  # Simulation is pure Python, so more threads only contend for the GIL
+SOLVE_WORKERS = 4  # Rovers whose mines are being solved; the PINs themselves go to the process pool
+WRITE_WORKERS = 2
+QUEUE_SIZE = 4  # Rovers waiting between two stages before the earlier stage blocks
+
+_DONE = object()  # Put on a queue after the last rover
+
+
+class RoverRun:
+    """One rover on its way through the pipeline."""
+
+    def __init__(self, rover_id):
+        self.rover_id = rover_id
+        self.commands = ""
+        self.key = None  # The rover's result cache key
+        self.result = None  # SimResult, simulated or from the result cache
+        self.digs = []  # (x, y, serial number) of every mine the rover dug
+        self.pins = []
+
+
+class RoverPipeline:
+    """Runs part2_sequential's rovers as fetch -> simulate -> solve -> write stages.
+
+    The stages are connected by bounded queues and each runs its own number
+    of workers, so while one rover's PINs are solved on the process pool the
+    next rover is simulated, later ones are fetched and earlier ones are
+    written. The whole run takes about as long as its slowest stage instead
+    of the sum of all of them. Rovers whose map, mines and commands are
+    unchanged since an earlier run take their result from the result cache
+    and are neither simulated nor written again.
+    """
+
+    def __init__(self, grid, mines, difficulty=pin_solver.DIFFICULTY, output=path_writer.TEXT,
+                 fetch_workers=FETCH_WORKERS, simulate_workers=SIMULATE_WORKERS, solve_workers=SOLVE_WORKERS,
+                 write_workers=WRITE_WORKERS, queue_size=QUEUE_SIZE, pool=None, base_url=command_fetcher.API_URL):
+        self.grid = grid
+        self.mine_index = MineIndex(grid)
+        self.mines = mines
+        self.difficulty = difficulty
+        self.writer = path_writer.PathWriter(output)
+        self.cache = result_cache.default_cache()
+        self.inputs = result_cache.inputs_digest(grid, mines)
+        self.workers = {"fetch": fetch_workers, "simulate": simulate_workers, "solve": solve_workers,
+                        "write": write_workers}
+        self.queue_size = queue_size
+        self.pool = pool or pin_solver.get_process_pool()[0]
+        self.base_url = base_url
+        self.busy = dict.fromkeys(self.workers, 0.0)  # Seconds each stage spent working, summed over workers
+
+    async def fetch(self, run):
+        response = await self.fetcher.fetch_async(run.rover_id)
+        result = response.json() if response.ok else {}
+        if result.get("result"):
+            run.commands = result["data"]["moves"]
+        else:
+            print(f"Failed to fetch commands for Rover {run.rover_id}, Status Code: {response.status_code}")
+        return run
+
+    def _simulate(self, run):
+        dug = []  # Every mine dug in order, with or without a serial number
+
+        def dig_mine(x, y):
+            dug.append((x, y))
+            index = x * self.grid.cols + y
+            if index < len(self.mines):
+                run.digs.append((x, y, self.mines[index]))
+            else:
+                print(f"Rover {run.rover_id} dug a mine at ({x}, {y}) with no serial number")
+
+        def explode(x, y):
+            print(f"Rover {run.rover_id} exploded at ({x}, {y})")
+
+        run.key = result_cache.result_key(SIMULATOR, self.inputs, run.commands)
+        run.result = self.cache.get(run.key)
+        if run.result is not None:
+            # Unchanged since an earlier run: only the digs are replayed, for their PINs
+            for x, y in run.result.dug:
+                dig_mine(x, y)
+            if run.result.exploded is not None:
+                explode(*run.result.exploded)
+            return run
+
+        track = trace_path(run.commands, self.grid, self.mine_index, on_dig=dig_mine, on_explode=explode)
+        run.result = result_cache.SimResult.from_track(track, dug)
+        self.cache.put(run.key, run.result)
+        return run
+
+    async def simulate(self, run):
+        # Off the event loop, so fetches keep going while a rover is simulated
+        return await asyncio.get_running_loop().run_in_executor(self.threads, self._simulate, run)
+
+    async def solve(self, run):
+        """Solve the rover's mines on the process pool, taking PINs solved before from the cache."""
+        cache = pin_cache.default_cache()
+        loop = asyncio.get_running_loop()
+        solve = partial(pin_solver.find_valid_pin, difficulty=self.difficulty, layout=pin_solver.SERIAL_PIN)
+
+        async def solve_mine(serial_number):
+            pin = cache.get(serial_number, self.difficulty, pin_solver.SERIAL_PIN)
+            if pin is None:
+                with phase_trace.span("find_valid_pin", run.rover_id, serial=serial_number):
+                    pin = await loop.run_in_executor(self.pool, solve, serial_number)
+                cache.put(serial_number, self.difficulty, pin_solver.SERIAL_PIN, pin)
+            return pin
+
+        run.pins = await asyncio.gather(*(solve_mine(serial_number) for _, _, serial_number in run.digs))
+        for (x, y, _), pin in zip(run.digs, run.pins):
+            print(f"Rover {run.rover_id} dug mine at ({x}, {y}) with PIN: {pin}")
+        return run
+
+    async def write(self, run):
+        await asyncio.get_running_loop().run_in_executor(self.threads, result_cache.write_cached, self.writer,
+                                                         self.cache, run.rover_id, run.key, run.result)
+        return run
+
+    async def _stage(self, name, inbox, outbox):
+        """Run the stage's workers over inbox until it is closed, then close outbox."""
+        work = getattr(self, name)
+
+        async def worker():
+            while True:
+                run = await inbox.get()
+                if run is _DONE:
+                    await inbox.put(_DONE)  # So the stage's other workers stop too
+                    return
+                start_time = time.perf_counter()
+                with phase_trace.span(name, run.rover_id):
+                    run = await work(run)
+                self.busy[name] += time.perf_counter() - start_time
+                if outbox is not None:
+                    await outbox.put(run)
+
+        await asyncio.gather(*(worker() for _ in range(self.workers[name])))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def run_async(self, rover_ids):
+        self.fetcher = command_fetcher.CommandFetcher(self.base_url, concurrency=self.workers["fetch"])
+        queues = [asyncio.Queue(self.queue_size) for _ in self.workers]  # Into fetch, simulate, solve, write
+
+        async def feed():
+            for rover_id in rover_ids:
+                await queues[0].put(RoverRun(rover_id))
+            await queues[0].put(_DONE)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers["simulate"] + self.workers["write"]) as self.threads:
+                stages = [self._stage(name, inbox, outbox)
+                          for name, inbox, outbox in zip(self.workers, queues, queues[1:] + [None])]
+                await asyncio.gather(feed(), *stages)
+        finally:
+            self.fetcher.close()
+        self.writer.close()
+
+    def run(self, rover_ids):
+        asyncio.run(self.run_async(rover_ids))
+
+
+def main():
+    """Run rovers 1..n (default 10) through the pipeline: python rover_pipeline.py [rovers] [difficulty]"""
+    rovers = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    difficulty = int(sys.argv[2]) if len(sys.argv) > 2 else pin_solver.DIFFICULTY
+
+    grid = MineGrid.from_cells(*map_loader.load_map("map.txt"))
+    with open("mines.txt", "r") as file:
+        mines = [line.strip() for line in file]
+
+    pipeline = RoverPipeline(grid, mines, difficulty)
+    start_time = time.time()
+    pipeline.run(range(1, rovers + 1))
+    print(f"Pipeline processing time: {time.time() - start_time} seconds")
+    for name, busy in pipeline.busy.items():
+        print(f"  {name:>8}: {busy:.2f} seconds busy over {pipeline.workers[name]} workers")
+    phase_trace.default_tracer().report("pipeline")  # Per rover spans of every stage
+
+
+if __name__ == "__main__":
+    main()
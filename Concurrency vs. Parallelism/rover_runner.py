@@ -0,0 +1,206 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import command_fetcher
+import map_loader
+import path_writer
+import phase_trace
+import pin_solver
+import shared_grid
+from command_compiler import MineIndex, trace_path
+from mine_grid import MineGrid
+
+# Set by init_worker or init_shared_worker in every process or interpreter that runs rovers
+_shared = None  # The shared memory block _grid and _mine_index view, kept open while they are used
+_grid = None
+_mine_index = None
+_mines = None
+_difficulty = None
+_writer = None
+_base_url = command_fetcher.API_URL
+
+
+def load_grid(map_file="map.txt"):
+    return MineGrid.from_cells(*map_loader.load_map(map_file))
+
+
+def init_worker(map_file="map.txt", mines_file="mines.txt", difficulty=pin_solver.DIFFICULTY,
+                base_url=command_fetcher.API_URL):
+    """Load the map and mines for the rovers this process will run."""
+    global _grid, _mine_index
+    _grid = load_grid(map_file)
+    _mine_index = MineIndex(_grid)
+    _init_rovers(mines_file, difficulty, base_url)
+
+
+def init_shared_worker(grid_handle, mines_file="mines.txt", difficulty=pin_solver.DIFFICULTY,
+                       base_url=command_fetcher.API_URL):
+    """Attach to the grid the parent published with SharedGrid, instead of loading or receiving a copy."""
+    global _shared, _grid, _mine_index
+    _shared, _grid, _mine_index = shared_grid.attach_grid(grid_handle)
+    _init_rovers(mines_file, difficulty, base_url)
+
+
+def _init_rovers(mines_file, difficulty, base_url):
+    global _mines, _difficulty, _writer, _base_url
+    with open(mines_file, "r") as file:
+        _mines = [line.strip() for line in file]
+    _difficulty = difficulty
+    _writer = path_writer.PathWriter()
+    _base_url = base_url
+    if base_url != command_fetcher.API_URL:  # e.g. stub_api's local stub
+        command_fetcher.set_default_fetcher(command_fetcher.CommandFetcher(base_url))
+
+
+def parse_commands(rover_id, response):
+    """Return the moves in an API response, or "" if the API had none for the rover."""
+    result = response.json() if response.ok else {}
+    if result.get("result"):
+        return result["data"]["moves"]
+    print(f"Failed to fetch commands for Rover {rover_id}, Status Code: {response.status_code}")
+    return ""
+
+
+def finish_rover(rover_id, commands, start_time):
+    """The simulation core every backend shares: simulate, solve the dug mines' PINs and write the path.
+
+    PINs are solved without the PIN cache, so every backend does the same
+    hashing and their timings compare. Returns (rover_id, mines disarmed,
+    seconds since start_time, phase spans), the spans drained from this
+    worker's tracer so they travel back from processes with the result.
+    """
+    digs = []
+
+    def dig_mine(x, y):
+        index = x * _grid.cols + y
+        if index < len(_mines):
+            digs.append((x, y, _mines[index]))
+
+    with phase_trace.span("simulate", rover_id):
+        track = trace_path(commands, _grid, _mine_index, on_dig=dig_mine)
+    for x, y, serial_number in digs:
+        with phase_trace.span("find_valid_pin", rover_id, serial=serial_number):
+            pin = pin_solver.find_valid_pin(serial_number, _difficulty, pin_solver.SERIAL_PIN)
+        print(f"Rover {rover_id} dug mine at ({x}, {y}) with PIN: {pin}")
+    with phase_trace.span("write", rover_id):
+        _writer.write_track(rover_id, track)
+    return rover_id, len(digs), time.perf_counter() - start_time, phase_trace.default_tracer().drain()
+
+
+def run_rover(rover_id):
+    """Fetch, simulate, solve and write one rover."""
+    start_time = time.perf_counter()
+    with phase_trace.span("fetch", rover_id):
+        response = command_fetcher.default_fetcher().fetch(rover_id)
+    return finish_rover(rover_id, parse_commands(rover_id, response), start_time)
+
+
+def run_sequential(rover_ids, workers, worker_args):
+    init_worker(*worker_args)
+    return [run_rover(rover_id) for rover_id in rover_ids]
+
+
+def run_threads(rover_ids, workers, worker_args):
+    init_worker(*worker_args)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_rover, rover_ids))
+
+
+def run_processes(rover_ids, workers, worker_args):
+    # Spawned like pin_solver's pool. The grid is published once in shared
+    # memory, so tasks carry nothing but rover IDs
+    map_file, *rover_args = worker_args or ("map.txt",)
+    with shared_grid.SharedGrid(load_grid(map_file)) as shared:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_shared_worker, initargs=(shared.handle, *rover_args)) as pool:
+            return list(pool.map(run_rover, rover_ids))
+
+
+def run_interpreters(rover_ids, workers, worker_args):
+    # One interpreter per worker in this process: parallel like processes, without spawning any
+    map_file, *rover_args = worker_args or ("map.txt",)
+    with shared_grid.SharedGrid(load_grid(map_file)) as shared:
+        with concurrent.futures.InterpreterPoolExecutor(max_workers=workers, initializer=init_shared_worker,
+                                                        initargs=(shared.handle, *rover_args)) as pool:
+            return list(pool.map(run_rover, rover_ids))
+
+
+def run_asyncio(rover_ids, workers, worker_args):
+    """Fetch every rover concurrently on one event loop; simulation and hashing run on the loop as answers arrive."""
+    init_worker(*worker_args)
+
+    async def run_all(fetcher):
+        async def run_one(rover_id):
+            start_time = time.perf_counter()
+            with phase_trace.span("fetch", rover_id):
+                response = await fetcher.fetch_async(rover_id)
+            return finish_rover(rover_id, parse_commands(rover_id, response), start_time)
+
+        return await asyncio.gather(*(run_one(rover_id) for rover_id in rover_ids))
+
+    with command_fetcher.CommandFetcher(_base_url, concurrency=workers) as fetcher:
+        return asyncio.run(run_all(fetcher))
+
+
+BACKENDS = {
+    "sequential": run_sequential,
+    "threads": run_threads,
+    "processes": run_processes,
+    "asyncio": run_asyncio,
+}
+if hasattr(concurrent.futures, "InterpreterPoolExecutor"):  # Python 3.14+
+    BACKENDS["interpreters"] = run_interpreters
+
+
+def run_backend(backend, rover_ids, workers=None, worker_args=()):
+    """Run rovers on one backend and return (wall seconds, [(rover_id, mines, seconds, spans), ...])."""
+    start_time = time.perf_counter()
+    results = BACKENDS[backend](list(rover_ids), workers or os.cpu_count() or 1, worker_args)
+    return time.perf_counter() - start_time, results
+
+
+def main():
+    """Run rovers on one backend or all of them and print a timing summary per backend.
+
+    Each backend's phase spans go to trace_<backend>.json, and p50/p95 per
+    phase are printed after the summary.
+    python rover_runner.py [backend|all] [rovers] [difficulty] [workers]
+    """
+    backend = sys.argv[1] if len(sys.argv) > 1 else "threads"
+    rovers = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    difficulty = int(sys.argv[3]) if len(sys.argv) > 3 else pin_solver.DIFFICULTY
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    if backend != "all" and backend not in BACKENDS:
+        print(f"Usage: python rover_runner.py [{'|'.join(BACKENDS)}|all] [rovers] [difficulty] [workers]")
+        return
+
+    summary = []
+    phases = []
+    for name in BACKENDS if backend == "all" else [backend]:
+        try:
+            elapsed, results = run_backend(name, range(1, rovers + 1), workers, ("map.txt", "mines.txt", difficulty))
+        except Exception as e:
+            summary.append(f"  {name:>12}: failed ({e})")
+            continue
+        mines = sum(result[1] for result in results)
+        slowest = max((result[2] for result in results), default=0.0)
+        summary.append(f"  {name:>12}: {elapsed:8.2f} seconds, {len(results) / elapsed:8.2f} rovers/sec, "
+                       f"{mines} mines, slowest rover {slowest:.2f} seconds")
+        tracer = phase_trace.PhaseTracer()
+        for result in results:
+            tracer.extend(result[3])
+        tracer.write(f"trace_{name}.json", name)
+        phases.append(tracer.summary(name))
+
+    print(f"\n{rovers} rovers at difficulty {difficulty}:")
+    print("\n".join(summary))
+    print("\n".join(phases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import numpy as np
+
+BATCH_SIZE = 1 << 15  # PIN candidates hashed per call, one uint32 lane each
+
+# SHA-256 round constants and initial hash values (FIPS 180-4)
+_K = np.array([
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2,
+], dtype=np.uint32)
+
+_H = np.array([
+    0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19,
+], dtype=np.uint32)
+
+
+def _rotr(x, n):
+    """Rotate every uint32 lane right by n bits."""
+    return (x >> np.uint32(n)) | (x << np.uint32(32 - n))
+
+
+def pad_messages(head, tail, pins, digits):
+    """Build the padded key head + PIN + tail for every PIN as big-endian words.
+
+    All PINs must have the same number of digits. Returns an array of shape
+    (blocks, 16, len(pins)), one column per candidate.
+    """
+    length = len(head) + digits + len(tail)
+    blocks = (length + 8) // 64 + 1  # Room for the 0x80 byte and 64-bit length
+    message = np.zeros((len(pins), blocks * 64), dtype=np.uint8)
+
+    message[:, :len(head)] = np.frombuffer(head, dtype=np.uint8)
+    powers = 10 ** np.arange(digits - 1, -1, -1, dtype=np.int64)
+    message[:, len(head):len(head) + digits] = pins[:, None] // powers % 10 + ord("0")
+    message[:, len(head) + digits:length] = np.frombuffer(tail, dtype=np.uint8)
+    message[:, length] = 0x80
+    message[:, -8:] = np.frombuffer((length * 8).to_bytes(8, "big"), dtype=np.uint8)
+
+    words = message.view(">u4").astype(np.uint32)
+    return np.ascontiguousarray(words.T).reshape(blocks, 16, len(pins))
+
+
+def compress(blocks):
+    """Run SHA-256 over padded message blocks and return the 8 state words per lane."""
+    lanes = blocks.shape[2]
+    state = [np.full(lanes, value, dtype=np.uint32) for value in _H]
+
+    for block in blocks:
+        # Message schedule
+        w = list(block)
+        for t in range(16, 64):
+            s0 = _rotr(w[t - 15], 7) ^ _rotr(w[t - 15], 18) ^ (w[t - 15] >> np.uint32(3))
+            s1 = _rotr(w[t - 2], 17) ^ _rotr(w[t - 2], 19) ^ (w[t - 2] >> np.uint32(10))
+            w.append(w[t - 16] + s0 + w[t - 7] + s1)
+
+        # Compression rounds
+        a, b, c, d, e, f, g, h = state
+        for t in range(64):
+            s1 = _rotr(e, 6) ^ _rotr(e, 11) ^ _rotr(e, 25)
+            ch = g ^ (e & (f ^ g))
+            temp1 = h + s1 + ch + _K[t] + w[t]
+            s0 = _rotr(a, 2) ^ _rotr(a, 13) ^ _rotr(a, 22)
+            maj = (a & b) | (c & (a | b))
+            h, g, f, e, d, c, b, a = g, f, e, d + temp1, c, b, a, temp1 + s0 + maj
+
+        state = [word + value for word, value in zip(state, (a, b, c, d, e, f, g, h))]
+    return state
+
+
+def leading_zeros_mask(state, difficulty):
+    """Return a bool per lane: does the digest start with `difficulty` zero hex digits?"""
+    mask = np.ones(len(state[0]), dtype=bool)
+    for word in state:
+        if difficulty <= 0:
+            break
+        bits = min(difficulty, 8) * 4
+        mask &= (word >> np.uint32(32 - bits)) == 0
+        difficulty -= 8
+    return mask
+
+
+def first_valid_pin(head, tail, start, stop, difficulty, batch_size=BATCH_SIZE):
+    """Return the lowest PIN in [start, stop) whose key hash meets the difficulty, or None.
+
+    PINs are hashed batch_size at a time; a batch never crosses a power of ten
+    so every key in it has the same length.
+    """
+    pin = start
+    while pin < stop:
+        next_power = 10 ** len(str(pin))
+        end = min(stop, pin + batch_size, next_power)
+
+        pins = np.arange(pin, end, dtype=np.int64)
+        state = compress(pad_messages(head, tail, pins, len(str(pin))))
+        hits = np.flatnonzero(leading_zeros_mask(state, difficulty))
+        if len(hits):
+            return pin + int(hits[0])
+
+        pin = end
+    return None
@@ -0,0 +1,46 @@
+from multiprocessing.shared_memory import SharedMemory
+
+from command_compiler import MineIndex
+from mine_grid import MineGrid
+
+
+def _bits_size(rows, cols):
+    """Return the size of a rows x cols grid's packed bits, which are all the block holds."""
+    return rows * ((cols + 7) // 8)
+
+
+class SharedGrid:
+    """A MineGrid published once in shared memory for process workers.
+
+    Workers get the small picklable `handle` instead of the map and call
+    attach_grid(handle), so no task ever carries the grid. The publisher
+    owns the block and frees it in close(). Each worker's MineIndex reads
+    the lines its rovers use from the shared bits.
+    """
+
+    def __init__(self, grid):
+        bits_size = _bits_size(grid.rows, grid.cols)
+        self.memory = SharedMemory(create=True, size=max(bits_size, 1))
+        self.memory.buf[:bits_size] = grid.bits
+        self.handle = (self.memory.name, grid.rows, grid.cols)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_grid(handle):
+    """Attach to a SharedGrid by its handle and return (memory, grid, mine_index) viewing it in place.
+
+    Keep `memory` referenced for as long as the grid is used.
+    """
+    name, rows, cols = handle
+    memory = SharedMemory(name=name)
+    grid = MineGrid.from_bits(rows, cols, memory.buf[:_bits_size(rows, cols)])
+    return memory, grid, MineIndex(grid)
@@ -0,0 +1,72 @@
+import sys
+import time
+import tracemalloc
+
+import command_fetcher
+import map_loader
+import path_writer
+import stub_api
+from command_compiler import MineIndex, stream_path, trace_path
+from mine_grid import MineGrid, SparseTrack
+
+
+def run_streamed(rover_id, grid, mine_index, writer, base_url=command_fetcher.API_URL):
+    """Simulate a rover while its program downloads and write each straight run to trail_<id>.txt as it ends.
+
+    Neither the program nor a dense path is ever held: memory stays the same
+    however many commands the rover is sent. Returns (track, runs).
+    """
+    track = SparseTrack(grid)
+    runs = 0
+    with open(f"trail_{rover_id}.txt", "w") as trail:
+        commands = command_fetcher.stream_moves(rover_id, base_url)
+        for x, y, direction, steps in stream_path(commands, grid, mine_index, track=track):
+            trail.write(f"{x} {y} {'NESW'[direction]} {steps}\n")
+            runs += 1
+    writer.write_track(rover_id, track)
+    return track, runs
+
+
+def run_whole(rover_id, grid, mine_index, writer, base_url=command_fetcher.API_URL):
+    """Fetch the whole program, then simulate it, as the other scripts do. Returns the track."""
+    with command_fetcher.CommandFetcher(base_url) as fetcher:
+        response = fetcher.fetch(rover_id)
+    track = trace_path(response.json()["data"]["moves"], grid, mine_index)
+    writer.write_track(rover_id, track)
+    return track
+
+
+def main():
+    """Run one rover with a long program from a local stub, streamed and then whole, and compare time and memory.
+
+    python stream_rover.py [commands] [rover_id]
+    """
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rover_id = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    base_url, server = stub_api.serve_stub(length=commands)
+    grid = MineGrid.from_cells(*map_loader.load_map("map.txt"))
+    mine_index = MineIndex(grid)
+    writer = path_writer.PathWriter()
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    streamed, runs = run_streamed(rover_id, grid, mine_index, writer, base_url)
+    elapsed = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    print(f"Streamed: {commands} commands in {elapsed:.2f} seconds, {runs} runs written to trail_{rover_id}.txt, "
+          f"peak memory {peak / 2**20:.1f} MiB")
+
+    tracemalloc.reset_peak()
+    start_time = time.perf_counter()
+    whole = run_whole(rover_id, grid, mine_index, writer, base_url)
+    elapsed = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"Whole:    {commands} commands in {elapsed:.2f} seconds, peak memory {peak / 2**20:.1f} MiB")
+
+    assert list(streamed) == list(whole) and streamed.dug == whole.dug
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
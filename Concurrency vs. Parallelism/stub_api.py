@@ -0,0 +1,97 @@
+import json
+import math
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STREAM_CHUNK = 64 * 1024  # Bytes of a long program generated and sent at a time
+
+
+def fixed_latency(seconds):
+    return lambda: seconds
+
+
+def tail_latency(typical, slow, probability):
+    """Latency that is `typical`, except one answer in 1/probability takes `slow`."""
+    return lambda: slow if random.random() < probability else typical
+
+
+def lognormal_latency(median, sigma):
+    """Latency spread like real network calls: mostly near `median`, with a long tail."""
+    return lambda: random.lognormvariate(math.log(median), sigma)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers GET /lab1/rover/<id> like the lab API, with a fixed program per rover."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, as the real API does
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes
+    latency = staticmethod(fixed_latency(0.0))  # Seconds to wait before each answer, standing in for the network
+    length = None  # Moves and turns in every program, sent as a chunked body; None for short programs like the API's
+
+    def do_GET(self):
+        rover_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        rng = random.Random(rover_id)
+        if self.length is not None:
+            self.send_long_program(rng)
+            return
+        moves = "".join(rng.choice("LRMMMD") for _ in range(rng.randint(50, 200)))
+        body = json.dumps({"result": True, "data": {"moves": moves}}).encode()
+        delay = self.latency()
+        if delay:
+            time.sleep(delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_long_program(self, rng):
+        """Send a program of `length` moves and turns, generated and written a chunk at a time.
+
+        Every move may be followed by a dig, so a rover following it never explodes and runs
+        the whole program.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_chunk(data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+        send_chunk(b'{"result": true, "data": {"moves": "')
+        for start in range(0, self.length, STREAM_CHUNK):
+            count = min(STREAM_CHUNK, self.length - start)
+            send_chunk("".join(rng.choices(("L", "R", "MD"), k=count)).encode("ascii"))
+        send_chunk(b'"}}')
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the benchmark output
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Room for a whole pool connecting at once
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+        # Otherwise the client hung up, as a hedged request's loser does
+
+
+def serve_stub(port=0, latency=0.0, length=None):
+    """Start a stub lab API on localhost in a background thread and return its base URL and server.
+
+    `latency` is seconds per answer, or a function returning them such as tail_latency(...).
+    With `length`, every program has that many commands and is streamed.
+    """
+    if not callable(latency):
+        latency = fixed_latency(latency)
+    handler = type("Handler", (StubHandler,), {"latency": staticmethod(latency), "length": length})
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/lab1/rover", server
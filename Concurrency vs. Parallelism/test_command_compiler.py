@@ -0,0 +1,138 @@
+import random
+import unittest
+
+from command_compiler import DIRECTIONS, compile_commands, compile_stream, stream_path, trace_path
+
+
+def calculate_path(commands, map_data):
+    """part1_sequential's original calculate_path, without its prints, as the reference."""
+    x, y = 0, 0
+    direction = 'S'  # Initial direction is South
+    path = [[cell for cell in row] for row in map_data]  # Copy the map data
+    path[x][y] = '*'  # Starting position
+
+    i = 0
+    while i < len(commands):
+        cmd = commands[i]
+
+        if cmd == 'L':
+            direction = {'S': 'E', 'E': 'N', 'N': 'W', 'W': 'S'}[direction]
+        elif cmd == 'R':
+            direction = {'S': 'W', 'W': 'N', 'N': 'E', 'E': 'S'}[direction]
+        elif cmd == 'M':
+            next_x, next_y = x, y
+            if direction == 'S' and x < len(map_data) - 1:
+                next_x += 1
+            elif direction == 'N' and x > 0:
+                next_x -= 1
+            elif direction == 'E' and y < len(map_data[0]) - 1:
+                next_y += 1
+            elif direction == 'W' and y > 0:
+                next_y -= 1
+
+            if map_data[next_x][next_y] == 1:
+                if i + 1 < len(commands) and commands[i + 1] == 'D':
+                    map_data[next_x][next_y] = 0  # Dig the mine
+                    i += 1  # Skip the next command (D)
+                else:
+                    path[next_x][next_y] = 'X'
+                    break  # Rover explodes
+
+            x, y = next_x, next_y
+            path[x][y] = '*'
+
+        i += 1
+
+    return path
+
+
+def random_map(rng):
+    rows, cols = rng.randint(1, 12), rng.randint(1, 12)
+    density = rng.choice((0, 0.05, 0.2, 0.5))
+    return [[int(rng.random() < density) for _ in range(cols)] for _ in range(rows)]
+
+
+def random_program(rng):
+    """A program of LRMD with long runs of moves and the odd other character, which is a no-op."""
+    pieces = []
+    for _ in range(rng.randint(0, 60)):
+        kind = rng.random()
+        if kind < 0.4:
+            pieces.append("M" * rng.randint(1, 15))
+        elif kind < 0.8:
+            pieces.append(rng.choice("LRD"))
+        elif kind < 0.95:
+            pieces.append("MD")
+        else:
+            pieces.append(rng.choice(" X"))
+    return "".join(pieces)
+
+
+def split_randomly(rng, commands):
+    """Cut a program into pieces at random points, mid-run included, with the odd empty piece."""
+    cuts = sorted(rng.randint(0, len(commands)) for _ in range(rng.randint(0, 8)))
+    return [commands[start:stop] for start, stop in zip([0] + cuts, cuts + [len(commands)])]
+
+
+class CompileCommandsTest(unittest.TestCase):
+    def test_runs_fold_into_opcodes(self):
+        self.assertEqual(compile_commands("MMMDLLLRMM"), [("M", 3, True), ("T", 2), ("M", 2, False)])
+        self.assertEqual(compile_commands("LRLR"), [])
+        self.assertEqual(compile_commands(""), [])
+
+
+class TracePathTest(unittest.TestCase):
+    def test_matches_calculate_path_on_random_programs(self):
+        rng = random.Random(10)
+        for case in range(1500):
+            map_data = random_map(rng)
+            commands = random_program(rng)
+            with self.subTest(case=case, commands=commands, map_data=map_data):
+                expected = calculate_path(commands, [row[:] for row in map_data])
+                self.assertEqual(list(trace_path(commands, map_data)), expected)
+
+    def test_mine_on_the_starting_cell(self):
+        # Moving into the edge from (0, 0) stays put and finds the mine under the rover
+        map_data = [[1, 0], [0, 0]]
+        for commands in ("LLM", "LLMD", "LLMDM", "LLMDLLM"):
+            with self.subTest(commands=commands):
+                expected = calculate_path(commands, [row[:] for row in map_data])
+                self.assertEqual(list(trace_path(commands, map_data)), expected)
+
+
+class StreamPathTest(unittest.TestCase):
+    def test_compile_stream_matches_compile_commands_however_split(self):
+        rng = random.Random(20)
+        for case in range(1000):
+            commands = random_program(rng)
+            pieces = split_randomly(rng, commands)
+            with self.subTest(case=case, pieces=pieces):
+                self.assertEqual(list(compile_stream(pieces)), compile_commands(commands))
+
+    def test_every_single_character_piece(self):
+        for commands in ("MMMDLLLRMM", "MDMD", "RRRRMM", "M D", "LLLLL"):
+            with self.subTest(commands=commands):
+                self.assertEqual(list(compile_stream(iter(commands))), compile_commands(commands))
+
+    def test_stream_path_matches_calculate_path_on_split_programs(self):
+        rng = random.Random(21)
+        for case in range(1500):
+            map_data = random_map(rng)
+            commands = random_program(rng)
+            pieces = split_randomly(rng, commands)
+            with self.subTest(case=case, pieces=pieces, map_data=map_data):
+                expected = calculate_path(commands, [row[:] for row in map_data])
+                self.assertEqual(list(trace_path(iter(pieces), map_data)), expected)
+
+                # The yielded runs cover exactly the cells the rover went through
+                cells = {(0, 0)}
+                for x, y, direction, steps in stream_path(iter(pieces), map_data):
+                    dx, dy = DIRECTIONS[direction]
+                    cells.update((x + dx * step, y + dy * step) for step in range(1, steps + 1))
+                visited = {(x, y) for x, row in enumerate(expected) for y, cell in enumerate(row) if cell == "*"}
+                visited.add((0, 0))  # The start is an 'X' if the rover blew up without leaving it
+                self.assertEqual(cells, visited)
+
+
+if __name__ == "__main__":
+    unittest.main()
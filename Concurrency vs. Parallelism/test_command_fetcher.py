@@ -0,0 +1,237 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+import requests
+
+import command_fetcher
+import stub_api
+from command_fetcher import CommandFetcher, LatencyStats, RetryBudget
+from stub_api import StubHandler, StubServer
+
+
+def start_stub(handler):
+    """Serve `handler` on localhost in a background thread and return (base URL, server)."""
+    server = StubServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/lab1/rover", server
+
+
+class CountingHandler(StubHandler):
+    """The stub API, counting the connections it was opened on and how many are still open."""
+
+    opened = 0
+    open_now = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            type(self).opened += 1
+            type(self).open_now += 1
+
+    def finish(self):
+        super().finish()
+        with self.lock:
+            type(self).open_now -= 1
+
+
+class RedirectHandler(StubHandler):
+    """Moves every rover from /old/<id> to /lab1/rover/<id>."""
+
+    def do_GET(self):
+        if self.path.startswith("/old/"):
+            self.send_response(301)
+            self.send_header("Location", "/lab1/rover/" + self.path.rsplit("/", 1)[-1])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+class MissingHandler(StubHandler):
+    """Knows no rovers."""
+
+    def do_GET(self):
+        self.send_error(404)
+
+
+class FlakyHandler(StubHandler):
+    """Answers 503 to the first `failures` requests for each rover, then like the API."""
+
+    failures = 2
+    seen = {}
+
+    def do_GET(self):
+        rover_id = self.path.rsplit("/", 1)[-1]
+        self.seen[rover_id] = self.seen.get(rover_id, 0) + 1
+        if self.seen[rover_id] <= self.failures:
+            self.send_error(503)
+            return
+        super().do_GET()
+
+
+class SlowFirstHandler(StubHandler):
+    """Takes a second over the first request for each rover and answers the rest at once."""
+
+    seen = set()
+
+    def do_GET(self):
+        rover_id = self.path.rsplit("/", 1)[-1]
+        if rover_id not in self.seen:
+            self.seen.add(rover_id)
+            time.sleep(1)
+        super().do_GET()
+
+
+class CommandFetcherTest(unittest.TestCase):
+    def setUp(self):
+        handler = type("Handler", (CountingHandler,), {"opened": 0, "open_now": 0})
+        self.handler = handler
+        self.base_url, self.server = start_stub(handler)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_returns_the_api_answer(self):
+        expected = requests.get(f"{self.base_url}/7").json()
+        with CommandFetcher(self.base_url) as fetcher:
+            response = fetcher.fetch(7)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+        self.assertTrue(response.json()["data"]["moves"])
+
+    def test_fetch_many_reuses_pooled_connections(self):
+        self.handler.opened = 0
+        with CommandFetcher(self.base_url, concurrency=4) as fetcher:
+            responses = fetcher.fetch_many(range(1, 101))
+        self.assertEqual(sorted(responses), list(range(1, 101)))
+        self.assertTrue(all(response.ok for response in responses.values()))
+        self.assertLessEqual(self.handler.opened, 4)
+
+    def test_fetch_async_on_an_event_loop(self):
+        async def fetch_all(fetcher):
+            return await fetcher.fetch_many_async(range(1, 21))
+
+        with CommandFetcher(self.base_url, concurrency=4) as fetcher:
+            responses = asyncio.run(fetch_all(fetcher))
+            expected = fetcher.fetch_many(range(1, 21))
+        self.assertEqual({rover_id: response.json() for rover_id, response in responses.items()},
+                         {rover_id: response.json() for rover_id, response in expected.items()})
+
+    def test_close_closes_the_connections(self):
+        with CommandFetcher(self.base_url, concurrency=4) as fetcher:
+            fetcher.fetch_many(range(1, 21))
+            self.assertGreater(self.handler.open_now, 0)
+        deadline = time.time() + 5
+        while self.handler.open_now and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.handler.open_now, 0)
+
+    def test_follows_redirects(self):
+        base_url, server = start_stub(RedirectHandler)
+        try:
+            with CommandFetcher(base_url.replace("/lab1/rover", "/old")) as fetcher:
+                response = fetcher.fetch(3)
+            self.assertEqual(response.json(), requests.get(f"{base_url}/3").json())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class RetryAndHedgeTest(unittest.TestCase):
+    def serve(self, handler, **attributes):
+        base_url, server = start_stub(type("Handler", (handler,), attributes))
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return base_url
+
+    def test_retries_5xx_until_an_answer(self):
+        base_url = self.serve(FlakyHandler, failures=2, seen={})
+        with CommandFetcher(base_url, backoff=0.01) as fetcher:
+            response = fetcher.fetch(1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(fetcher.stats.retries, 2)
+        self.assertEqual(fetcher.stats.calls, 1)
+
+    def test_budget_caps_retries(self):
+        base_url = self.serve(FlakyHandler, failures=100, seen={})
+        with CommandFetcher(base_url, backoff=0.01, budget=RetryBudget(ratio=0, reserve=1)) as fetcher:
+            first = fetcher.fetch(1)
+            second = fetcher.fetch(2)
+        self.assertEqual((first.status_code, second.status_code), (503, 503))
+        self.assertEqual(fetcher.stats.retries, 1)  # The one reserve token
+        self.assertEqual(fetcher.stats.budget_exhausted, 2)
+
+    def test_hedge_answers_before_a_slow_first_request(self):
+        base_url = self.serve(SlowFirstHandler, seen=set())
+        with CommandFetcher(base_url, hedge=True) as fetcher:
+            start_time = time.perf_counter()
+            response = fetcher.fetch(1)
+            elapsed = time.perf_counter() - start_time
+        self.assertTrue(response.ok)
+        self.assertLess(elapsed, 0.9)
+        self.assertEqual((fetcher.stats.hedges, fetcher.stats.hedges_won), (1, 1))
+
+    def test_no_hedge_without_budget(self):
+        base_url = self.serve(SlowFirstHandler, seen=set())
+        with CommandFetcher(base_url, hedge=True, budget=RetryBudget(ratio=0, reserve=0)) as fetcher:
+            start_time = time.perf_counter()
+            response = fetcher.fetch(1)
+            elapsed = time.perf_counter() - start_time
+        self.assertTrue(response.ok)
+        self.assertGreaterEqual(elapsed, 0.9)
+        self.assertEqual((fetcher.stats.hedges, fetcher.stats.budget_exhausted), (0, 1))
+
+
+class LatencyStatsTest(unittest.TestCase):
+    def test_percentiles_of_recent_calls(self):
+        stats = LatencyStats(window=100)
+        self.assertIsNone(stats.percentile(50))
+        for milliseconds in range(200):  # Only the last 100 are kept
+            stats.record(milliseconds / 1000)
+        self.assertEqual(stats.percentile(50), 0.15)
+        self.assertEqual(stats.percentile(100), 0.199)
+        self.assertIn("p95=195.0ms", stats.summary())
+
+    def test_budget_earns_a_share_of_requests(self):
+        budget = RetryBudget(ratio=0.5, reserve=0)
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+
+class StreamMovesTest(unittest.TestCase):
+    def test_streamed_program_matches_the_whole_answer(self):
+        base_url, server = stub_api.serve_stub(length=200000)
+        try:
+            streamed = "".join(command_fetcher.stream_moves(5, base_url, chunk_size=4096))
+            whole = requests.get(f"{base_url}/5").json()["data"]["moves"]
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(streamed, whole)
+
+    def test_iter_moves_splits_anywhere(self):
+        body = json.dumps({"result": True, "data": {"moves": "LMMRDM"}}).encode()
+        for size in range(1, len(body) + 1):
+            pieces = [body[start:start + size] for start in range(0, len(body), size)]
+            self.assertEqual("".join(command_fetcher.iter_moves(pieces)), "LMMRDM")
+
+    def test_http_error_raises(self):
+        base_url, server = start_stub(MissingHandler)
+        try:
+            with self.assertRaises(requests.HTTPError):
+                list(command_fetcher.stream_moves(1, base_url))
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
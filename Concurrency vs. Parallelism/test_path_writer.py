@@ -0,0 +1,96 @@
+import os
+import random
+import tempfile
+import unittest
+
+import path_writer
+from mine_grid import MineGrid, RoverTrack
+
+
+def write_path_to_file(path, rover_id):
+    """part1_sequential's original writer, as the reference for text output."""
+    with open(f"path_{rover_id}.txt", 'w') as file:
+        for row in path:
+            file.write(' '.join([str(cell) for cell in row]) + '\n')
+
+
+def random_track(rng, rows, cols):
+    """A RoverTrack over a random map, with random cells visited and maybe an explosion."""
+    grid = MineGrid([[int(rng.random() < 0.3) for _ in range(cols)] for _ in range(rows)])
+    track = RoverTrack(grid)
+    for _ in range(rng.randint(0, rows * cols)):
+        track.visit(rng.randrange(rows), rng.randrange(cols))
+    if rng.random() < 0.3:
+        track.explode(rng.randrange(rows), rng.randrange(cols))
+    return track
+
+
+class PathWriterTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)  # Path files go to the working directory
+        self.addCleanup(os.chdir, cwd)
+        self.rng = random.Random(13)
+        self.sizes = [(1, 1), (3, 0), (1, 9), (7, 8), (8, 7), (9, 17), (30, 30)]
+
+    def read(self, file_name):
+        with open(file_name, "rb") as file:
+            return file.read()
+
+    def test_text_is_byte_identical_to_write_path_to_file(self):
+        writer = path_writer.PathWriter(path_writer.TEXT)
+        for rows, cols in self.sizes:
+            with self.subTest(rows=rows, cols=cols):
+                track = random_track(self.rng, rows, cols) if cols else None
+                path = list(track) if track else [[] for _ in range(rows)]
+                write_path_to_file(path, 1)
+                expected = self.read("path_1.txt")
+
+                writer.write(2, path_writer.grid_cells(path), rows, cols)
+                self.assertEqual(self.read("path_2.txt"), expected)
+                if track:
+                    writer.write_track(3, track)
+                    self.assertEqual(self.read("path_3.txt"), expected)
+
+    def test_visited_cells_render_like_the_threaded_labs(self):
+        for rows, cols in self.sizes[:1] + self.sizes[2:]:
+            with self.subTest(rows=rows, cols=cols):
+                track = random_track(self.rng, rows, cols)
+                track.exploded = None  # execute_commands never marks explosions
+                path = [["*" if cell == "*" else "0" for cell in row] for row in track]
+                self.assertEqual(path_writer.visited_cells(track), path_writer.grid_cells(path))
+
+    def test_rle_round_trip(self):
+        for rows, cols in self.sizes:
+            with self.subTest(rows=rows, cols=cols):
+                cells = bytes(self.rng.choice(b"01*X") if self.rng.random() < 0.2 else ord("0")
+                              for _ in range(rows * cols))
+                self.assertEqual(path_writer.decode_rle(path_writer.encode_rle(cells, rows, cols)),
+                                 (rows, cols, cells))
+        with self.assertRaises(ValueError):
+            path_writer.decode_rle(b"NOPE" + bytes(8))
+
+    def test_rle_and_archive_hold_the_text_grid(self):
+        tracks = {rover_id: random_track(self.rng, rows, cols)
+                  for rover_id, (rows, cols) in enumerate(self.sizes[2:], start=1)}
+        writers = [path_writer.PathWriter(mode) for mode in path_writer.MODES]
+        for writer in writers:
+            for rover_id, track in tracks.items():
+                writer.write_track(rover_id, track)
+            writer.close()
+
+        archived = path_writer.read_archive()
+        self.assertEqual(sorted(archived), sorted(tracks))
+        for rover_id, track in tracks.items():
+            with self.subTest(rover_id=rover_id):
+                rows, cols = track.grid.rows, track.grid.cols
+                text = self.read(f"path_{rover_id}.txt").split()
+                expected = (rows, cols, b"".join(text))
+                self.assertEqual(path_writer.decode_rle(self.read(f"path_{rover_id}.rle")), expected)
+                self.assertEqual(archived[rover_id], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+import pin_solver
+from pin_cache import PinCache
+
+
+class PinCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "pin_cache.db")
+
+    def test_put_then_get(self):
+        cache = PinCache(self.path)
+        self.assertIsNone(cache.get("A1", 6, pin_solver.PIN_SERIAL))
+        cache.put("A1", 6, pin_solver.PIN_SERIAL, 1234)
+        self.assertEqual(cache.get("A1", 6, pin_solver.PIN_SERIAL), 1234)
+
+        # Difficulty and key layout are part of the key
+        self.assertIsNone(cache.get("A1", 5, pin_solver.PIN_SERIAL))
+        self.assertIsNone(cache.get("A1", 6, pin_solver.SERIAL_PIN))
+
+        # Another process opening the same file sees the PIN
+        self.assertEqual(PinCache(self.path).get("A1", 6, pin_solver.PIN_SERIAL), 1234)
+
+    def test_evicts_the_least_recently_used(self):
+        cache = PinCache(self.path, max_entries=3)
+        for pin, serial_number in enumerate("ABC"):
+            cache.put(serial_number, 1, pin_solver.PIN_SERIAL, pin)
+            time.sleep(0.01)
+        cache.get("A", 1, pin_solver.PIN_SERIAL)  # A is now used more recently than B
+        time.sleep(0.01)
+
+        cache.put("D", 1, pin_solver.PIN_SERIAL, 3)
+        self.assertIsNone(cache.get("B", 1, pin_solver.PIN_SERIAL))
+        for pin, serial_number in ((0, "A"), (2, "C"), (3, "D")):
+            self.assertEqual(cache.get(serial_number, 1, pin_solver.PIN_SERIAL), pin)
+
+    def test_get_or_solve_solves_once(self):
+        cache = PinCache(self.path)
+        calls = []
+
+        def solve(serial_number, difficulty, layout):
+            calls.append((serial_number, difficulty, layout))
+            return 42
+
+        self.assertEqual(cache.get_or_solve("A1", 2, pin_solver.PIN_SERIAL, solve), 42)
+        self.assertEqual(cache.get_or_solve("A1", 2, pin_solver.PIN_SERIAL, solve), 42)
+        self.assertEqual(calls, [("A1", 2, pin_solver.PIN_SERIAL)])
+
+    def test_threads_share_the_cache(self):
+        cache = PinCache(self.path)
+        threads = [threading.Thread(target=cache.put, args=(f"S{n}", 1, pin_solver.PIN_SERIAL, n)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([cache.get(f"S{n}", 1, pin_solver.PIN_SERIAL) for n in range(8)], list(range(8)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+
+import pin_solver
+
+SERIALS = ["", "7", "A1B2C3", "serial-number-that-spans-a-longer-key"]
+LAYOUTS = (pin_solver.PIN_SERIAL, pin_solver.SERIAL_PIN)
+DIFFICULTIES = (1, 2, 3, 4)
+
+
+def brute_force(serial_number, start, stop, difficulty, layout):
+    """The lowest PIN in [start, stop) whose hex digest starts with `difficulty` zeros, the plain way."""
+    for pin in range(start, stop):
+        key = f"{pin}{serial_number}" if layout == pin_solver.PIN_SERIAL else f"{serial_number}{pin}"
+        if sha256(key.encode()).hexdigest().startswith("0" * difficulty):
+            return pin
+    return None
+
+
+class SearchPinRangeTest(unittest.TestCase):
+    search = staticmethod(pin_solver.search_pin_range)
+
+    def test_lowest_pin_from_zero(self):
+        for serial_number in SERIALS:
+            for layout in LAYOUTS:
+                for difficulty in DIFFICULTIES:
+                    with self.subTest(serial=serial_number, layout=layout, difficulty=difficulty):
+                        expected = brute_force(serial_number, 0, 1 << 20, difficulty, layout)
+                        self.assertEqual(self.search(serial_number, 0, 1 << 20, difficulty, layout), expected)
+
+    def test_ranges_across_block_edges(self):
+        # Starts and stops inside blocks, below BLOCK and across several blocks
+        bounds = [(0, 999), (1, 1001), (998, 2003), (4321, 7654), (99995, 100010), (123456, 130000)]
+        for serial_number in SERIALS[1:3]:
+            for layout in LAYOUTS:
+                for difficulty in (1, 2, 3):
+                    for start, stop in bounds:
+                        with self.subTest(serial=serial_number, layout=layout, difficulty=difficulty,
+                                          start=start, stop=stop):
+                            expected = brute_force(serial_number, start, stop, difficulty, layout)
+                            self.assertEqual(self.search(serial_number, start, stop, difficulty, layout), expected)
+
+    def test_empty_and_missed_ranges(self):
+        self.assertIsNone(self.search("7", 10, 10, 1))
+        pin = brute_force("7", 0, 1 << 20, 2, pin_solver.PIN_SERIAL)
+        self.assertIsNone(self.search("7", 0, pin, 2))
+        self.assertEqual(self.search("7", pin, pin + 1, 2), pin)
+
+
+class SearchPinRangeNumpyTest(SearchPinRangeTest):
+    search = staticmethod(pin_solver.search_pin_range_numpy)
+
+
+class FindValidPinParallelTest(unittest.TestCase):
+    def test_matches_the_sequential_search_on_a_thread_pool(self):
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            for serial_number in SERIALS:
+                for layout in LAYOUTS:
+                    for difficulty in DIFFICULTIES:
+                        with self.subTest(serial=serial_number, layout=layout, difficulty=difficulty):
+                            # Small chunks, so the hit is found with several chunks still in flight
+                            pin = pin_solver.find_valid_pin_parallel(serial_number, difficulty, layout, workers=3,
+                                                                     chunk_size=997, pool=pool)
+                            self.assertEqual(pin, brute_force(serial_number, 0, 1 << 20, difficulty, layout))
+
+    def test_matches_on_the_process_pool(self):
+        for layout in LAYOUTS:
+            with self.subTest(layout=layout):
+                pin = pin_solver.find_valid_pin_parallel("A1B2C3", 4, layout, chunk_size=4096)
+                self.assertEqual(pin, brute_force("A1B2C3", 0, 1 << 20, 4, layout))
+
+    def test_numpy_backend_on_the_process_pool(self):
+        for layout in LAYOUTS:
+            with self.subTest(layout=layout):
+                pin = pin_solver.find_valid_pin_parallel("A1B2C3", 4, layout, backend="numpy", chunk_size=4096)
+                self.assertEqual(pin, brute_force("A1B2C3", 0, 1 << 20, 4, layout))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+import path_writer
+import result_cache
+from mine_grid import MineGrid, RoverTrack
+from result_cache import ResultCache, SimResult
+
+MAP = [[0, 1, 0], [0, 0, 1], [1, 0, 0]]
+MINES = ["A1", "B2", "C3"]
+SIMULATOR = "test.simulate/1"
+
+
+def simulated(grid):
+    """A finished rover: went down the first column and dug the mine at (2, 0)."""
+    track = RoverTrack(grid)
+    for x in range(3):
+        track.visit(x, 0)
+    track.dig(2, 0)
+    return SimResult.from_track(track)
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cwd = os.getcwd()
+        os.chdir(directory.name)  # PathWriter writes to the working directory
+        self.addCleanup(os.chdir, cwd)
+        self.cache = ResultCache("result_cache.db")
+        self.grid = MineGrid(MAP)
+        self.key = result_cache.result_key(SIMULATOR, result_cache.inputs_digest(self.grid, MINES), "MMD")
+
+    def test_hit_returns_what_was_put(self):
+        result = simulated(self.grid)
+        self.cache.put(self.key, result)
+        cached = self.cache.get(self.key)
+        self.assertEqual((cached.rows, cached.cols, cached.cells, cached.exploded, cached.dug),
+                         (3, 3, b"*10*01*00", None, [(2, 0)]))
+
+        exploded = SimResult(3, 3, b"X" * 9, (1, 2), [(0, 1), (1, 1)])
+        self.cache.put("exploded", exploded)
+        cached = self.cache.get("exploded")
+        self.assertEqual((cached.exploded, cached.dug), ((1, 2), [(0, 1), (1, 1)]))
+
+    def test_miss_when_an_input_changes(self):
+        self.cache.put(self.key, simulated(self.grid))
+        other_map = MineGrid([[0, 1, 0], [0, 0, 1], [1, 0, 1]])
+        changed = {
+            "map": result_cache.result_key(SIMULATOR, result_cache.inputs_digest(other_map, MINES), "MMD"),
+            "mines": result_cache.result_key(SIMULATOR, result_cache.inputs_digest(self.grid, MINES[:2]), "MMD"),
+            "simulator": result_cache.result_key("test.simulate/2", result_cache.inputs_digest(self.grid, MINES),
+                                                 "MMD"),
+            "commands": result_cache.result_key(SIMULATOR, result_cache.inputs_digest(self.grid, MINES), "MMDM"),
+        }
+        for change, key in changed.items():
+            with self.subTest(change=change):
+                self.assertNotEqual(key, self.key)
+                self.assertIsNone(self.cache.get(key))
+        self.assertIsNotNone(self.cache.get(self.key))
+
+    def test_evicts_past_max_bytes(self):
+        cache = ResultCache("small.db", max_bytes=1)
+        cache.put("first", simulated(self.grid))
+        cache.put("second", simulated(self.grid))
+        self.assertIsNone(cache.get("first"))
+
+    def test_write_cached_skips_only_unchanged_files(self):
+        result = simulated(self.grid)
+        writer = path_writer.PathWriter(path_writer.TEXT)
+        self.assertTrue(result_cache.write_cached(writer, self.cache, 1, self.key, result))
+        with open("path_1.txt", "rb") as file:
+            written = file.read()
+        self.assertFalse(result_cache.write_cached(writer, self.cache, 1, self.key, result))
+
+        # Another writer changed the file: different size
+        with open("path_1.txt", "w") as file:
+            file.write("0 0 0\n")
+        self.assertTrue(result_cache.write_cached(writer, self.cache, 1, self.key, result))
+        with open("path_1.txt", "rb") as file:
+            self.assertEqual(file.read(), written)
+
+        # Same size, newer mtime
+        stat = os.stat("path_1.txt")
+        with open("path_1.txt", "wb") as file:
+            file.write(written.replace(b"*", b"X"))
+        os.utime("path_1.txt", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertTrue(result_cache.write_cached(writer, self.cache, 1, self.key, result))
+        with open("path_1.txt", "rb") as file:
+            self.assertEqual(file.read(), written)
+
+        # Deleted
+        os.remove("path_1.txt")
+        self.assertTrue(result_cache.write_cached(writer, self.cache, 1, self.key, result))
+        self.assertTrue(os.path.exists("path_1.txt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
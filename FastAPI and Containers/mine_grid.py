@@ -0,0 +1,154 @@
+from itertools import chain
+
+# Bits of every byte value, lowest bit first, for unpacking a row in one pass
+_BITS = [tuple((value >> bit) & 1 for bit in range(8)) for value in range(256)]
+
+
+# Cell values to binary digits: 1 is a mine, anything else is clear
+_DIGITS = bytes(ord("1") if value == 1 else ord("0") for value in range(256))
+
+
+def _pack(row, stride):
+    """Pack a row of 0/1 cells into `stride` bytes, cell y at bit y % 8 of byte y // 8."""
+    # Reversed, the row reads as a binary number whose bit y is cell y
+    return int(bytes(row).translate(_DIGITS)[::-1] or b"0", 2).to_bytes(stride, "little")
+
+
+def _unpack(bits, offset, stride, cols):
+    """Return `cols` cells (0 or 1) of the row packed at bits[offset:offset + stride]."""
+    return list(chain.from_iterable(map(_BITS.__getitem__, bits[offset:offset + stride])))[:cols]
+
+
+class MineGrid:
+    """The mine map packed one bit per cell, shared read-only by every rover.
+
+    Rows are padded to whole bytes, so a row is the `stride` bytes starting at
+    x * stride and cell (x, y) is bit y % 8 of byte y // 8 of that row.
+    """
+
+    def __init__(self, map_data):
+        self.rows = len(map_data)
+        self.cols = len(map_data[0]) if map_data else 0
+        self.stride = (self.cols + 7) // 8
+        self.bits = b"".join(_pack(row, self.stride) for row in map_data)
+
+    @classmethod
+    def from_cells(cls, rows, cols, cells):
+        """Pack map_loader's flat 0/1 cells (cell (x, y) at cells[x * cols + y]) without building rows first."""
+        stride = (cols + 7) // 8
+        return cls.from_bits(rows, cols, b"".join(_pack(cells[x * cols:(x + 1) * cols], stride) for x in range(rows)))
+
+    @classmethod
+    def from_bits(cls, rows, cols, bits):
+        """Wrap cells already packed the way MineGrid packs them, e.g. a view of shared memory, without copying."""
+        grid = cls.__new__(cls)
+        grid.rows, grid.cols, grid.stride = rows, cols, (cols + 7) // 8
+        grid.bits = bits
+        return grid
+
+    def is_mine(self, x, y):
+        """Return True if the map has a mine at (x, y)."""
+        return self.bits[x * self.stride + (y >> 3)] >> (y & 7) & 1 == 1
+
+    def set_mine(self, x, y, mine):
+        """Place or clear the mine at (x, y), for maps that change while they are in use."""
+        if isinstance(self.bits, bytes):
+            self.bits = bytearray(self.bits)
+        if mine:
+            self.bits[x * self.stride + (y >> 3)] |= 1 << (y & 7)
+        else:
+            self.bits[x * self.stride + (y >> 3)] &= ~(1 << (y & 7)) & 0xFF
+
+    def row_values(self, x):
+        """Return row x as map.txt has it: a list of 0s and 1s."""
+        return _unpack(self.bits, x * self.stride, self.stride, self.cols)
+
+
+class RoverTrack:
+    """One rover's changes on top of a shared MineGrid.
+
+    Holds only the mines the rover dug (a set), a visited bitset laid out like
+    the grid and where it exploded, so a rover costs one bit per cell instead
+    of a copy of the map. Iterating yields the rows of calculate_path's path
+    grid: map values, '*' where the rover went and 'X' where it exploded.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.dug = set()
+        self.visited = bytearray(grid.rows * grid.stride)
+        self.exploded = None
+
+    def is_mine(self, x, y):
+        """Return True if there is a mine at (x, y) this rover has not dug."""
+        return self.grid.is_mine(x, y) and (x, y) not in self.dug
+
+    def dig(self, x, y):
+        self.dug.add((x, y))
+
+    def visit(self, x, y):
+        self.visited[x * self.grid.stride + (y >> 3)] |= 1 << (y & 7)
+
+    def visit_run(self, x, y, dx, dy, steps):
+        """Mark the `steps` cells after (x, y) in direction (dx, dy) as visited."""
+        for step in range(1, steps + 1):
+            self.visit(x + dx * step, y + dy * step)
+
+    def explode(self, x, y):
+        self.exploded = (x, y)
+
+    def _row_bits(self, x):
+        """Return the visited bits of row x, packed like a row of the grid."""
+        stride = self.grid.stride
+        return self.visited[x * stride:(x + 1) * stride]
+
+    def path_row(self, x):
+        """Return row x of the path grid."""
+        grid = self.grid
+        visited = _unpack(self._row_bits(x), 0, grid.stride, grid.cols)
+        row = ["*" if seen else cell for cell, seen in zip(grid.row_values(x), visited)]
+        if self.exploded is not None and self.exploded[0] == x:
+            row[self.exploded[1]] = "X"
+        return row
+
+    def __iter__(self):
+        for x in range(self.grid.rows):
+            yield self.path_row(x)
+
+
+class SparseTrack(RoverTrack):
+    """A RoverTrack that only stores the rows the rover entered.
+
+    Each visited row is an int whose bit y is cell y, kept in a dict by row
+    number, so a rover costs memory for the rows along its path rather than
+    a bit for every cell of the map. Runs along a row are marked with one
+    mask. `visited` builds the dense bitset on demand for path_writer.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.dug = set()
+        self.visited_rows_bits = {}
+        self.exploded = None
+
+    def visit(self, x, y):
+        self.visited_rows_bits[x] = self.visited_rows_bits.get(x, 0) | 1 << y
+
+    def visit_run(self, x, y, dx, dy, steps):
+        if dx or not steps:
+            super().visit_run(x, y, dx, dy, steps)
+            return
+        first = min(y + dy, y + dy * steps)
+        self.visited_rows_bits[x] = self.visited_rows_bits.get(x, 0) | ((1 << steps) - 1) << first
+
+    def _row_bits(self, x):
+        return self.visited_rows_bits.get(x, 0).to_bytes(self.grid.stride, "little")
+
+    @property
+    def visited(self):
+        """The visited bitset laid out like the grid, as RoverTrack stores it."""
+        stride = self.grid.stride
+        bits = bytearray(self.grid.rows * stride)
+        for x, row in self.visited_rows_bits.items():
+            bits[x * stride:(x + 1) * stride] = row.to_bytes(stride, "little")
+        return bytes(bits)
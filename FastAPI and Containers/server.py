@@ -5,6 +5,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Tuple
+from command_compiler import MineIndex, TURN, compile_commands
 
 # Configuration
 BASE_DIR = Path(__file__).parent.absolute()
@@ -19,6 +20,7 @@ map_data: List[List[int]] = []
 mines: List[Dict] = []
 rovers: Dict[int, Dict] = {}
 next_rover_id: int = 1
+mine_index: Optional[MineIndex] = None  # Mine lines of map_data, rebuilt when the map is reset
 
 
 # Helper functions
@@ -47,6 +49,26 @@ def read_mines(file_name: str) -> None:
                     })
 
 
+def get_mine_index() -> MineIndex:
+    """Return the mine index for the current map, creating it if the map was reset"""
+    global mine_index
+    if mine_index is None:
+        mine_index = MineIndex(map_data)
+    return mine_index
+
+
+def invalidate_mine_index() -> None:
+    """Drop the mine index after map_data is replaced"""
+    global mine_index
+    mine_index = None
+
+
+def update_mine_index(x: int, y: int) -> None:
+    """Update the mine index's row x and column y after map_data[x][y] changed"""
+    if mine_index is not None:
+        mine_index.set_mine(x, y, map_data[x][y] == 1)
+
+
 # Load initial data
 read_map("map.txt")
 read_mines("mines.txt")
@@ -103,6 +125,7 @@ async def update_map(data: MapUpdate):
     global map_data
     map_data = [[0 for _ in range(data.cols)] for _ in range(data.rows)]
     mines.clear()
+    invalidate_mine_index()
     return {"message": f"Map reset to {data.rows}x{data.cols}"}
 
 
@@ -133,6 +156,7 @@ async def create_mine(data: MineCreate):
     }
     mines.append(new_mine)
     map_data[data.x][data.y] = 1
+    update_mine_index(data.x, data.y)
     return new_mine
 
 
@@ -149,8 +173,10 @@ async def update_mine(mine_id: int, data: MineUpdate):
         if not (0 <= data.x < len(map_data) and 0 <= data.y < len(map_data[0])):
             raise HTTPException(status_code=400, detail="New coordinates out of bounds")
         map_data[mine["x"]][mine["y"]] = 0
+        update_mine_index(mine["x"], mine["y"])
         mine["x"], mine["y"] = data.x, data.y
         map_data[data.x][data.y] = 1
+        update_mine_index(data.x, data.y)
 
     return mine
 
@@ -163,6 +189,7 @@ async def delete_mine(mine_id: int):
         raise HTTPException(status_code=404, detail="Mine not found")
 
     map_data[mine["x"]][mine["y"]] = 0
+    update_mine_index(mine["x"], mine["y"])
     mines = [m for m in mines if m["id"] != mine_id]
     return {"message": f"Mine {mine_id} deleted"}
 
@@ -238,27 +265,33 @@ async def dispatch_rover(rover_id: int):
         "W": (0, -1)
     }
 
-    for cmd in rover["commands"]:
-        if cmd in ["L", "R"]:
-            directions = ["N", "E", "S", "W"]
-            current_idx = directions.index(direction)
-            direction = directions[(current_idx + (1 if cmd == "R" else -1)) % 4]
-        elif cmd == "M":
-            dx, dy = direction_vectors[direction]
-            new_x, new_y = x + dx, y + dy
-
-            # Boundary check
-            if not (0 <= new_x < len(map_data) and 0 <= new_y < len(map_data[0])):
-                eliminated_at = (x, y)  # Eliminated at last valid position
-                break
-
-            x, y = new_x, new_y
-            path.append((x, y))
-
-            # Mine check
-            if map_data[x][y] == 1:
-                eliminated_at = (x, y)
-                break
+    # Commands are compiled so a run of moves is checked against the map in one lookup
+    directions = ["N", "E", "S", "W"]
+    index = get_mine_index()
+    for op in compile_commands(rover["commands"]):
+        if op[0] == TURN:
+            direction = directions[(directions.index(direction) + op[1]) % 4]
+            continue
+
+        count = op[1]
+        heading = directions.index(direction)
+        dx, dy = direction_vectors[direction]
+        room = index.to_edge(x, y, heading)
+        hit = index.first_mine(x, y, heading, min(count, room))
+
+        steps = min(count, room) if hit is None else hit
+        path.extend((x + dx * step, y + dy * step) for step in range(1, steps + 1))
+        x, y = x + dx * steps, y + dy * steps
+
+        # Mine check
+        if hit is not None:
+            eliminated_at = (x, y)
+            break
+
+        # Boundary check
+        if count > room:
+            eliminated_at = (x, y)  # Eliminated at last valid position
+            break
 
     rover.update({
         "x": x,
@@ -0,0 +1,57 @@
+import itertools
+
+import requests
+
+API_URL = "https://coe892.reev.dev/lab1/rover"
+TIMEOUT = 10
+STREAM_CHUNK = 64 * 1024  # Bytes read at a time when a program is streamed
+
+
+def iter_moves(body):
+    """Yield the "moves" string of an API answer in pieces, given the answer's body as an iterable of bytes.
+
+    Only the bytes up to the key and the piece being yielded are held, so
+    a program of any length streams in constant memory. Yields nothing if
+    the answer has no moves. Moves are plain letters, so escapes are not
+    decoded.
+    """
+    key = b'"moves"'
+    chunks = iter(body)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        start = head.find(key)
+        if start >= 0:
+            break
+        head = head[-(len(key) - 1):]  # The key may start at the end of this piece
+    else:
+        return
+
+    head = head[start + len(key):]
+    while b'"' not in head:  # Past the colon to the value's opening quote
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        head += chunk
+
+    for piece in itertools.chain([head[head.index(b'"') + 1:]], chunks):
+        end = piece.find(b'"')
+        if end >= 0:
+            if end:
+                yield piece[:end].decode("ascii")
+            return
+        if piece:
+            yield piece.decode("ascii")
+
+
+def stream_moves(rover_id, base_url=API_URL, chunk_size=STREAM_CHUNK, timeout=TIMEOUT):
+    """Yield one rover's program in pieces as it downloads, for command_compiler.stream_path.
+
+    For programs too long to hold as a string, e.g. millions of commands
+    sent with a chunked body. Each stream has a connection of its own
+    rather than one from a CommandFetcher's pool, and an HTTP error raises
+    requests.HTTPError.
+    """
+    with requests.get(f"{base_url.rstrip('/')}/{rover_id}", stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        yield from iter_moves(response.iter_content(chunk_size))
@@ -2,66 +2,183 @@ import pika
 import grpc
 import rover_pb2
 import rover_pb2_grpc
-import hashlib
+import pin_cache
+import pin_solver
 import sys
+import threading
 import time
+import uuid
 
+CANCEL_EXCHANGE = 'Demine-Cancel'  # Fanout: job ids of sharded mines Ground Control has a PIN for
+CANCELLED_TTL = 3600  # Seconds a cancelled job id is remembered, long after its queued ranges are consumed
+PRESOLVED_QUEUE = 'Presolved-PINs'  # Ground Control answers a serial number here with its pre-solved PIN
+PRESOLVED_TIMEOUT = 1  # Seconds to wait for Ground Control before hashing anyway
 
-def find_valid_pin(serial_number):
-    """Brute-force SHA-256 to find a valid PIN with 6 leading zeros."""
-    pin = 0
-    while True:
-        key = f"{pin}{serial_number}"
-        hashed_key = hashlib.sha256(key.encode()).hexdigest()
-        if hashed_key.startswith("000000"):  # Looking for 6 leading zeros
-            return pin
-        pin += 1
+cancelled_jobs = {}  # Job id -> when it was cancelled
 
 
-def process_mine(ch, method, properties, body, deminer_id):
-    """Callback function to process incoming mine messages."""
+def ask_ground_control(serial_number):
+    """Return Ground Control's pre-solved PIN for a serial number, or None if it has none ready."""
+    connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
+    channel = connection.channel()
+    channel.queue_declare(queue=PRESOLVED_QUEUE)
+    reply_queue = channel.queue_declare(queue='', exclusive=True).method.queue
+    correlation_id = uuid.uuid4().hex
+    channel.basic_publish(exchange='', routing_key=PRESOLVED_QUEUE, body=serial_number,
+                          properties=pika.BasicProperties(reply_to=reply_queue, correlation_id=correlation_id))
+
+    pin = None
+    for method, properties, body in channel.consume(reply_queue, auto_ack=True,
+                                                    inactivity_timeout=PRESOLVED_TIMEOUT):
+        if method is None:
+            break  # Ground Control is not answering
+        if properties.correlation_id == correlation_id:
+            pin = int(body) if body else None
+            break
+    channel.cancel()
+    connection.close()
+    return pin
+
+
+def find_valid_pin(serial_number, backend="hashlib", start=0, stop=None, cancelled=None,
+                   difficulty=pin_solver.DIFFICULTY):
+    """Brute-force SHA-256 to find the lowest valid PIN in [start, stop) (6 leading zeros by default).
+
+    Before hashing, the local PIN cache and then Ground Control's pre-solved
+    PINs are checked; a PIN known there is returned whatever the range. Progress
+    is checkpointed to the local PIN cache after every chunk, so when a killed
+    deminer's message is redelivered the next deminer resumes where it stopped.
+    Returns None if the range has no valid PIN or cancelled() becomes true.
+
+    Only a search from PIN 0 finds the serial's lowest valid PIN, so only its
+    hits are cached.
+    """
+    cache = pin_cache.default_cache()
+    layout = pin_solver.PIN_SERIAL
+    pin = cache.get(serial_number, difficulty, layout)
+    if pin is None and difficulty == pin_solver.DIFFICULTY:
+        pin = ask_ground_control(serial_number)
+        if pin is not None:
+            cache.put(serial_number, difficulty, layout, pin)
+    if pin is not None:
+        return pin
+
+    resume = cache.get_progress(serial_number, difficulty, layout, start)
+    if resume != start:
+        print(f"Resuming search for {serial_number} at PIN {resume}.")
+
+    def checkpoint(next_pin):
+        cache.save_progress(serial_number, difficulty, layout, start, next_pin)
+
+    pin = pin_solver.search_pin_chunks(serial_number, resume, stop, difficulty, layout, backend,
+                                       cancelled=cancelled, checkpoint=checkpoint)
+    if pin is not None and start == 0:
+        cache.put(serial_number, difficulty, layout, pin)
+    elif pin is not None:
+        cache.clear_progress(serial_number, difficulty, layout)
+    return pin
+
+
+def find_valid_pin_range(serial_number, job_id, start, stop, backend="hashlib", difficulty=pin_solver.DIFFICULTY):
+    """Search one PIN range of a sharded mine, returning None on a miss or if its PIN was already found."""
+    if job_id in cancelled_jobs:
+        return None
+    return find_valid_pin(serial_number, backend, start, stop, cancelled=lambda: job_id in cancelled_jobs,
+                          difficulty=difficulty)
+
+
+def listen_for_cancellations():
+    """Record the job ids Ground Control broadcasts on the cancel exchange so running ranges can stop."""
+    connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
+    channel = connection.channel()
+    channel.exchange_declare(exchange=CANCEL_EXCHANGE, exchange_type='fanout')
+    queue = channel.queue_declare(queue='', exclusive=True).method.queue
+    channel.queue_bind(exchange=CANCEL_EXCHANGE, queue=queue)
+
+    def callback(ch, method, properties, body):
+        now = time.time()
+        for job_id, cancelled_at in list(cancelled_jobs.items()):
+            if cancelled_at < now - CANCELLED_TTL:
+                del cancelled_jobs[job_id]  # Its ranges were consumed long ago
+        cancelled_jobs[body.decode()] = now
+
+    channel.basic_consume(queue=queue, on_message_callback=callback, auto_ack=True)
+    channel.start_consuming()
+
+
+def process_mine(ch, method, properties, body, deminer_id, backend="hashlib"):
+    """Callback function to process incoming mine messages.
+
+    Messages are "mine_id,serial,x,y" for a whole mine, or
+    "mine_id,serial,x,y,job_id,start,stop,stride" for the PIN range [start, stop)
+    of a sharded mine. A range without a hit queues the range `stride` PINs on,
+    so each shard walks its own ranges until Ground Control cancels the job.
+    """
     message = body.decode()
-    mine_id, serial_number, x, y = message.split(",")
+    mine_id, serial_number, x, y, *shard_info = message.split(",")
 
     print(f"Deminer {deminer_id} received mine {mine_id} at ({x}, {y}) with serial number {serial_number}.")
 
     start_time = time.time()
-    pin = find_valid_pin(serial_number)  # Perform brute-force hashing
+    if shard_info:
+        job_id, start, stop, stride = shard_info[0], int(shard_info[1]), int(shard_info[2]), int(shard_info[3])
+        print(f"Deminer {deminer_id} searching PINs {start}-{stop - 1} of mine {mine_id}.")
+        pin = find_valid_pin_range(serial_number, job_id, start, stop, backend)
+    else:
+        pin = find_valid_pin(serial_number, backend)  # Perform brute-force hashing
     end_time = time.time()
 
-    print(f"Deminer {deminer_id} found PIN {pin} for mine {mine_id} in {end_time - start_time:.2f} seconds.")
-
-    # Publish the PIN to the Defused-Mines queue
     connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
     channel = connection.channel()
-    channel.queue_declare(queue='Defused-Mines')
-    channel.basic_publish(exchange='', routing_key='Defused-Mines', body=str(pin))
+    if pin is None and job_id in cancelled_jobs:
+        pin_cache.default_cache().clear_progress(serial_number, pin_solver.DIFFICULTY, pin_solver.PIN_SERIAL)
+        print(f"Deminer {deminer_id} dropped PINs {start}-{stop - 1} of mine {mine_id}, its PIN was already found.")
+    elif pin is None:
+        # Queue the next range of this shard before acking, so a crash cannot lose it
+        next_range = f"{mine_id},{serial_number},{x},{y},{job_id},{start + stride},{stop + stride},{stride}"
+        channel.queue_declare(queue='Demine-Queue')
+        channel.basic_publish(exchange='', routing_key='Demine-Queue', body=next_range)
+        print(f"Deminer {deminer_id} found no PIN in {start}-{stop - 1} of mine {mine_id}, "
+              f"queued PINs {start + stride}-{stop + stride - 1}.")
+    else:
+        print(f"Deminer {deminer_id} found PIN {pin} for mine {mine_id} in {end_time - start_time:.2f} seconds.")
+
+        # Publish the PIN to the Defused-Mines queue; Ground Control keeps the first one per sharded job
+        channel.queue_declare(queue='Defused-Mines')
+        defused = f"{mine_id},{serial_number},{pin},{job_id}" if shard_info else f"{mine_id},{serial_number},{pin}"
+        channel.basic_publish(exchange='', routing_key='Defused-Mines', body=defused)
+        print(f"Deminer {deminer_id} published PIN {pin} to Defused-Mines.")
     connection.close()
 
-    print(f"Deminer {deminer_id} published PIN {pin} to Defused-Mines.")
-
     # Acknowledge the message so it's removed from the queue
     ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
 def main():
     """Main function for the deminer."""
-    if len(sys.argv) != 2:
-        print("Usage: python deminer.py <deminer_id>")
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] not in pin_solver.BACKENDS):
+        print(f"Usage: python deminer.py <deminer_id> [{'|'.join(pin_solver.BACKENDS)}]")
         return
 
     deminer_id = int(sys.argv[1])
+    backend = sys.argv[2] if len(sys.argv) == 3 else "hashlib"
     print(f"Deminer {deminer_id} is online and listening for mines...")
 
+    # Listen for cancelled sharded mines in the background
+    cancel_thread = threading.Thread(target=listen_for_cancellations)
+    cancel_thread.daemon = True
+    cancel_thread.start()
+
     # Set up RabbitMQ subscriber
     connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
     channel = connection.channel()
     channel.queue_declare(queue='Demine-Queue')
+    channel.basic_qos(prefetch_count=1)  # One mine or range at a time, so ranges spread across deminers
 
     # Consume messages from the queue
     channel.basic_consume(queue='Demine-Queue',
                           on_message_callback=lambda ch, method, properties, body: process_mine(ch, method, properties,
-                                                                                                body, deminer_id))
+                                                                                                body, deminer_id, backend))
 
     print(f"Deminer {deminer_id} is waiting for mine tasks...")
     channel.start_consuming()
@@ -3,22 +3,47 @@ from concurrent import futures
 import pika
 import rover_pb2
 import rover_pb2_grpc
+import map_loader
+import pin_cache
+import pin_solver
+import sys
 import threading
-import requests  # Import requests to make API calls
+import time
+import command_fetcher  # Streams rover programs from the API as they download
+
+CANCEL_EXCHANGE = 'Demine-Cancel'  # Fanout: job ids of sharded mines whose first PIN has come in
+DEFUSED_TTL = 3600  # Seconds a defused job id is remembered to drop later PINs for it
+PRESOLVED_QUEUE = 'Presolved-PINs'  # Deminers ask here for a serial number's pre-solved PIN
 
 class GroundControlServicer(rover_pb2_grpc.GroundControlServicer):
-    def __init__(self):
+    def __init__(self, presolve=False):
         # Initialize the server by reading the map and mines
         self.mine_serials = self.read_mines("mines.txt")
-        self.grid, self.rows, self.cols = self.read_map("map.txt")
+        self.map_rows, self.rows, self.cols = self.read_map("map.txt")
+
+        if presolve:
+            presolve_thread = threading.Thread(target=self.presolve_pins, args=(list(self.mine_serials),))
+            presolve_thread.daemon = True
+            presolve_thread.start()
+
+    def presolve_pins(self, serials):
+        """Solve PINs for the known serials in the order rovers will be handed them.
+
+        Each serial is solved on every core of the process pool and stored in the
+        PIN cache (pin_cache.db), where answer_presolved_pins finds it for
+        deminers asking before they hash.
+        """
+        cache = pin_cache.default_cache()
+        for serial_number in serials:
+            pin = cache.get_or_solve(serial_number, pin_solver.DIFFICULTY, pin_solver.PIN_SERIAL,
+                                     pin_solver.find_valid_pin_parallel)
+            print(f"Pre-solved PIN {pin} for mine serial number '{serial_number}'.")
+        print(f"All {len(serials)} mine PINs are ready.")
 
     def read_map(self, file_name):
-        """Read the map from a file and return it as a 2D list."""
-        with open(file_name, "r") as file:
-            lines = file.readlines()
-            rows, cols = map(int, lines[0].strip().split())  # Read the first line for dimensions
-            grid = [list(map(int, line.strip().split())) for line in lines[1:]]  # Read the grid
-        return grid, rows, cols
+        """Read the map from a file and return its rows as the space separated strings GetMap sends."""
+        rows, cols, cells = map_loader.load_map(file_name)  # map.bin is memory-mapped when it is current
+        return [" ".join(map(str, cells[x * cols:(x + 1) * cols])) for x in range(rows)], rows, cols
 
     def read_mines(self, file_name):
         """Read the mine serial numbers from a file and return them as a list."""
@@ -29,19 +54,21 @@ class GroundControlServicer(rover_pb2_grpc.GroundControlServicer):
         """Handle the GetMap RPC call."""
         print(f"Rover {request.rover_id} is requesting the map.")
         map_response = rover_pb2.MapResponse()
-        map_response.map.extend([" ".join(map(str, row)) for row in self.grid])  # Convert the grid to strings
+        map_response.map.extend(self.map_rows)  # Rows were converted to strings once, when the map was read
         print(f"Map information sent to Rover {request.rover_id}.")
         return map_response
 
     def GetCommands(self, request, context):
         """Handle the GetCommands RPC call."""
         print(f"Rover {request.rover_id} is requesting commands.")
-        commands = self.fetch_rover_commands(request.rover_id)
-        if commands:
-            for command in commands:
-                print(f"Sending command '{command}' to Rover {request.rover_id}.")
+        sent = 0
+        # Commands go out as the API sends them, so no program is ever held whole
+        for chunk in self.stream_rover_commands(request.rover_id):
+            for command in chunk:
                 yield rover_pb2.CommandResponse(command=command)
-        else:
+            sent += len(chunk)
+            print(f"Sent {sent} commands to Rover {request.rover_id}.")
+        if not sent:
             print(f"Failed to retrieve commands for Rover {request.rover_id}.")
 
     def GetMineSerialNumber(self, request, context):
@@ -54,49 +81,80 @@ class GroundControlServicer(rover_pb2_grpc.GroundControlServicer):
         print(f"No mine serial numbers left for Rover {request.rover_id}.")
         return rover_pb2.MineSerialResponse(serial_number="")
 
-    def fetch_rover_commands(self, rover_id):
-        """Fetch rover commands from the public API."""
-        url = f"https://coe892.reev.dev/lab1/rover/{rover_id}"  # API endpoint
+    def stream_rover_commands(self, rover_id):
+        """Yield rover commands from the public API in pieces as they download."""
         try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("result"):  # Ensure valid response
-                    commands = result["data"]["moves"]
-                    print(f"Fetched commands for Rover {rover_id}: {commands}")
-                    return list(commands)  # Return commands as a list
-            print(f"Error fetching commands for Rover {rover_id}: {response.text}")
+            yield from command_fetcher.stream_moves(rover_id)
         except Exception as e:
             print(f"Exception fetching commands for Rover {rover_id}: {e}")
-        return []
 
 def subscribe_to_defused_mines():
-    """Subscribe to the Defused-Mines RabbitMQ channel and log defused mine PINs."""
+    """Subscribe to the Defused-Mines RabbitMQ channel and log defused mine PINs.
+
+    Messages are "mine_id,serial,pin", or "mine_id,serial,pin,job_id" from a
+    range of a sharded mine. The first PIN for a job wins: it is logged and the
+    job is cancelled on every deminer, and any later PIN for it is dropped.
+    """
     connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
     channel = connection.channel()
     channel.queue_declare(queue='Defused-Mines')
+    channel.exchange_declare(exchange=CANCEL_EXCHANGE, exchange_type='fanout')
+    defused_jobs = {}  # Job id -> when its first PIN came in
 
     def callback(ch, method, properties, body):
-        print(f"Defused mine PIN: {body.decode()}")
+        mine_id, serial_number, pin, *job = body.decode().split(",")
+        if job:
+            now = time.time()
+            for job_id, defused_at in list(defused_jobs.items()):
+                if defused_at < now - DEFUSED_TTL:
+                    del defused_jobs[job_id]
+            if job[0] in defused_jobs:
+                print(f"Dropped PIN {pin} for mine {mine_id} (serial number '{serial_number}'), it is already defused.")
+                return
+            defused_jobs[job[0]] = now
+            ch.basic_publish(exchange=CANCEL_EXCHANGE, routing_key='', body=job[0])
+        print(f"Defused mine {mine_id} (serial number '{serial_number}') PIN: {pin}")
 
     channel.basic_consume(queue='Defused-Mines', on_message_callback=callback, auto_ack=True)
     print("Ground Control is listening for defused mines...")
     channel.start_consuming()
 
-def serve():
-    """Start the gRPC server and RabbitMQ subscriber."""
-    # Start the RabbitMQ subscriber in a separate thread
+def answer_presolved_pins():
+    """Answer deminers' requests for a serial number's PIN from the PIN cache.
+
+    Requests carry the serial number and a reply queue; the answer is the
+    cached PIN, or an empty body if it is not solved yet.
+    """
+    connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
+    channel = connection.channel()
+    channel.queue_declare(queue=PRESOLVED_QUEUE)
+    cache = pin_cache.default_cache()
+
+    def callback(ch, method, properties, body):
+        pin = cache.get(body.decode(), pin_solver.DIFFICULTY, pin_solver.PIN_SERIAL)
+        ch.basic_publish(exchange='', routing_key=properties.reply_to, body="" if pin is None else str(pin),
+                         properties=pika.BasicProperties(correlation_id=properties.correlation_id))
+
+    channel.basic_consume(queue=PRESOLVED_QUEUE, on_message_callback=callback, auto_ack=True)
+    channel.start_consuming()
+
+def serve(presolve=False):
+    """Start the gRPC server and RabbitMQ subscribers, optionally pre-solving every mine PIN."""
+    # Start the RabbitMQ subscribers in separate threads
     rabbitmq_thread = threading.Thread(target=subscribe_to_defused_mines)
     rabbitmq_thread.daemon = True
     rabbitmq_thread.start()
+    presolved_thread = threading.Thread(target=answer_presolved_pins)
+    presolved_thread.daemon = True
+    presolved_thread.start()
 
     # Start the gRPC server
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    rover_pb2_grpc.add_GroundControlServicer_to_server(GroundControlServicer(), server)
+    rover_pb2_grpc.add_GroundControlServicer_to_server(GroundControlServicer(presolve), server)
     server.add_insecure_port('[::]:50051')
     print("Ground Control Server started. Listening on port 50051...")
     server.start()
     server.wait_for_termination()
 
 if __name__ == '__main__':
-    serve()
+    serve(presolve="--presolve" in sys.argv[1:])
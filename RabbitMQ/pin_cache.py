@@ -0,0 +1,127 @@
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = "pin_cache.db"
+MAX_ENTRIES = 100000  # Least recently used PINs beyond this are evicted
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+class PinCache:
+    """Serial -> PIN results kept in SQLite, shared by every process on the host.
+
+    The database runs in WAL mode so readers never block the writer, and each
+    thread gets its own connection. Lookups refresh an entry's last use time;
+    once the table grows past max_entries the least recently used rows go.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pins ("
+                " serial TEXT NOT NULL, difficulty INTEGER NOT NULL, layout TEXT NOT NULL,"
+                " pin INTEGER NOT NULL, last_used REAL NOT NULL,"
+                " PRIMARY KEY (serial, difficulty, layout))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS pins_last_used ON pins (last_used)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS progress ("
+                " serial TEXT NOT NULL, difficulty INTEGER NOT NULL, layout TEXT NOT NULL,"
+                " start INTEGER NOT NULL, next_pin INTEGER NOT NULL,"
+                " PRIMARY KEY (serial, difficulty, layout, start))"
+            )
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, serial_number, difficulty, layout):
+        """Return the cached PIN for a serial number, or None on a miss."""
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT pin FROM pins WHERE serial = ? AND difficulty = ? AND layout = ?",
+            (serial_number, difficulty, layout),
+        ).fetchone()
+        if row is None:
+            return None
+
+        with connection:
+            connection.execute(
+                "UPDATE pins SET last_used = ? WHERE serial = ? AND difficulty = ? AND layout = ?",
+                (time.time(), serial_number, difficulty, layout),
+            )
+        return row[0]
+
+    def put(self, serial_number, difficulty, layout, pin):
+        """Store a solved PIN, drop its search checkpoints and evict the oldest entries past max_entries."""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM progress WHERE serial = ? AND difficulty = ? AND layout = ?",
+                (serial_number, difficulty, layout),
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO pins (serial, difficulty, layout, pin, last_used) VALUES (?, ?, ?, ?, ?)",
+                (serial_number, difficulty, layout, pin, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM pins WHERE last_used < "
+                "(SELECT last_used FROM pins ORDER BY last_used DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries - 1,),
+            )
+
+    def get_progress(self, serial_number, difficulty, layout, start):
+        """Return the PIN an interrupted search from `start` should resume at, or `start` to begin afresh."""
+        row = self._connection().execute(
+            "SELECT next_pin FROM progress WHERE serial = ? AND difficulty = ? AND layout = ? AND start = ?",
+            (serial_number, difficulty, layout, start),
+        ).fetchone()
+        return start if row is None else row[0]
+
+    def save_progress(self, serial_number, difficulty, layout, start, next_pin):
+        """Checkpoint that a search from `start` has found no valid PIN below `next_pin`."""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO progress (serial, difficulty, layout, start, next_pin) VALUES (?, ?, ?, ?, ?)",
+                (serial_number, difficulty, layout, start, next_pin),
+            )
+
+    def clear_progress(self, serial_number, difficulty, layout):
+        """Forget every checkpoint for a serial number, e.g. once another deminer solved it."""
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "DELETE FROM progress WHERE serial = ? AND difficulty = ? AND layout = ?",
+                (serial_number, difficulty, layout),
+            )
+
+    def get_or_solve(self, serial_number, difficulty, layout, solve):
+        """Return the cached PIN, or call solve(serial_number, difficulty, layout) and cache it."""
+        pin = self.get(serial_number, difficulty, layout)
+        if pin is None:
+            pin = solve(serial_number, difficulty, layout)
+            self.put(serial_number, difficulty, layout, pin)
+        return pin
+
+
+def default_cache():
+    """Return the process-wide cache at CACHE_PATH, opening it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PinCache()
+        return _default_cache
@@ -3,19 +3,36 @@ import pika
 import rover_pb2
 import rover_pb2_grpc
 import sys
+import uuid
 
-def publish_mine_details(mine_id, serial_number, x, y):
-    """Publish mine details to the Demine-Queue RabbitMQ channel."""
+RANGE_SIZE = 1 << 20  # PINs in one work unit of a sharded mine
+
+def publish_mine_details(mine_id, serial_number, x, y, shards=1):
+    """Publish mine details to the Demine-Queue RabbitMQ channel.
+
+    With shards > 1 the mine goes out as that many RANGE_SIZE PIN ranges that
+    share a job id, so several deminers can search it at once. Each range
+    carries the stride to its shard's next range, which the deminer queues on
+    a miss.
+    """
     connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
     channel = connection.channel()
     channel.queue_declare(queue='Demine-Queue')
 
-    message = f"{mine_id},{serial_number},{x},{y}"
-    channel.basic_publish(exchange='', routing_key='Demine-Queue', body=message)
-    print(f"Rover published mine details: {message}")
+    if shards > 1:
+        job_id = uuid.uuid4().hex
+        stride = shards * RANGE_SIZE
+        for start in range(0, stride, RANGE_SIZE):
+            message = f"{mine_id},{serial_number},{x},{y},{job_id},{start},{start + RANGE_SIZE},{stride}"
+            channel.basic_publish(exchange='', routing_key='Demine-Queue', body=message)
+        print(f"Rover published mine details in {shards} shards: {mine_id},{serial_number},{x},{y}")
+    else:
+        message = f"{mine_id},{serial_number},{x},{y}"
+        channel.basic_publish(exchange='', routing_key='Demine-Queue', body=message)
+        print(f"Rover published mine details: {message}")
     connection.close()
 
-def execute_commands(rover_id, commands, grid, rows, cols, stub):
+def execute_commands(rover_id, commands, grid, rows, cols, stub, shards=1):
     """Execute commands for the rover and explore the map."""
     x, y = 0, 0  # Starting position (top-left corner)
     direction = 2  # 0: North, 1: East, 2: South, 3: West
@@ -44,7 +61,7 @@ def execute_commands(rover_id, commands, grid, rows, cols, stub):
                     if serial_response.serial_number:
                         print(f"Rover {rover_id} retrieved serial number: {serial_response.serial_number}")
                         # Publish mine details to RabbitMQ
-                        publish_mine_details(mine_id, serial_response.serial_number, new_x, new_y)
+                        publish_mine_details(mine_id, serial_response.serial_number, new_x, new_y, shards)
                         mine_id += 1
                     else:
                         print(f"Rover {rover_id} could not retrieve a serial number for the mine.")
@@ -55,11 +72,12 @@ def execute_commands(rover_id, commands, grid, rows, cols, stub):
 
 def main():
     """Main function for the rover."""
-    if len(sys.argv) != 2:
-        print("Usage: python rover.py <rover_id>")
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python rover.py <rover_id> [shards_per_mine]")
         return
 
     rover_id = int(sys.argv[1])
+    shards = int(sys.argv[2]) if len(sys.argv) == 3 else 1
     print(f"Starting Rover {rover_id}...")
 
     # Connect to the ground control server
@@ -73,13 +91,10 @@ def main():
         rows, cols = len(grid), len(grid[0])
         print(f"Rover {rover_id} received the map. Grid size: {rows}x{cols}.")
 
-        # Get the commands from the ground control
+        # Get the commands from the ground control, executing each as it arrives
         print(f"Rover {rover_id} requesting commands...")
-        commands = [cmd.command for cmd in stub.GetCommands(rover_pb2.RoverRequest(rover_id=rover_id))]
-        print(f"Rover {rover_id} received commands: {''.join(commands)}")
-
-        # Execute the commands
-        execute_commands(rover_id, commands, grid, rows, cols, stub)
+        commands = (cmd.command for cmd in stub.GetCommands(rover_pb2.RoverRequest(rover_id=rover_id)))
+        execute_commands(rover_id, commands, grid, rows, cols, stub, shards)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -4,9 +4,11 @@ import grpc
 import proto_file_pb2
 import proto_file_pb2_grpc
 
-from map import create_rover_path, update_rover_path, mine_check
+from map import RoverPath, flush_maps, mine_check
 from mines import disarm_mine
 
+PATH_CHECKPOINT = 1000  # Moves between writes of rover_<id>.txt, which is also written at the end
+
 def run():
     with grpc.insecure_channel('localhost:50051') as channel:
         
@@ -26,8 +28,8 @@ def run():
         
         while True:
             try:
-                rover_id = input('Enter rover id (Between or including 1-10): ')
-                if ((int (rover_id) > 10) or (int (rover_id) < 1)):
+                rover_id = input('Enter rover id (1 or more): ')
+                if int (rover_id) < 1:
                     raise ValueError
                 break
             except ValueError:
@@ -46,8 +48,8 @@ def run():
         curr_col = 0
         direction_v = "SOUTH"
         fail = False
-        create_rover_path(rover_id, MAP_ROW_SIZE, MAP_COL_SIZE)
-        update_rover_path(rover_id, curr_row, curr_col)  # Initializing path
+        path = RoverPath(rover_id, MAP_ROW_SIZE, MAP_COL_SIZE, PATH_CHECKPOINT)  # Kept in memory while moving
+        path.mark(curr_row, curr_col)  # Initializing path
         for move in rover_commands:            
             if move == 'L' or move == 'R':
                 direction_v = update_direction(direction_v, move)
@@ -81,7 +83,7 @@ def run():
                         fail = True
                         break
                     dig = False
-                    update_rover_path(rover_id, curr_row, curr_col)
+                    path.mark(curr_row, curr_col)
 
             elif move == 'D':
                 dig = True
@@ -99,7 +101,10 @@ def run():
                     )        
                     response = stub.MinePin(request)  # Sending mine deactivation info back to server
                     mine_check(curr_row, curr_col, rover_id, disable=True)  # Marking map with diabled mine (check rover_*.txt)
+                    flush_maps()  # Other clients running this rover see the disarmed mine right away
         
+        path.flush()  # The whole path in one write
+        flush_maps()  # And the map with this run's disarmed mines
         if not fail:  # Send success notification to server
             request = proto_file_pb2.BotMessage(_message=f'Rover {rover_id} has successfully completed all commands.')
             response = stub.NotifyServer(request)   
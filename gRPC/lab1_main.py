@@ -1,16 +1,14 @@
-import requests
-import json
+import command_fetcher
 
 def get_rover_commands(rover_id):
     """
-    Function grabs the rover commands from the api
+    Function grabs the rover commands from the api, over the shared keep-alive connections
     :param rover_id: The rover id
     :return: Rover commands in JSON
     """
-    api = 'https://coe892.reev.dev/lab1/rover'
-    r = requests.get(f'{api}/{rover_id}')
+    r = command_fetcher.default_fetcher().fetch(rover_id)
     if r.ok:
-        content = json.loads(r.content)
+        content = r.json()
         return content['data']['moves']
     else:
         raise Exception("Failed to fetch api")
\ No newline at end of file
@@ -1,4 +1,8 @@
+import atexit
+import glob
+import os
 import random
+import map_loader
 
 def generate_map_grid(row=None, col=None, noChange=True) -> list[list[int]]:    
     if noChange:
@@ -55,56 +59,153 @@ def generate_map_grid(row=None, col=None, noChange=True) -> list[list[int]]:
     return fetch_map_info()
 
 def generate_text_map(grid: list[list[int]]):
-    
-    with open(f'map.txt', 'w') as f:
-        f.write(f'{len(grid)} {len(grid[0])}\n')
-        i = 0
-        j = 0
-        for row in grid:
-            i += 1
-            for col in row:
-                f.write(str (col))
-                j += 1
-                if (j < len(row)):
-                    f.write(' ')
-            if (i == len(grid)):
-                break
-            f.write('\n')
-            j = 0
-
-    for i in range(1, 11):
-        with open(f'map_{i}.txt', 'w') as f:
-            f.write(f'{len(grid)} {len(grid[0])}\n')
-            i = 0
-            j = 0
-            for row in grid:
-                i += 1
-                for col in row:
-                    f.write(str (col))
-                    j += 1
-                    if (j < len(row)):
-                        f.write(' ')
-                if (i == len(grid)):
-                    break
-                f.write('\n')
-                j = 0
+    """
+    Writes map.txt in one buffered write and clears the rovers' overlays (map_<id>.overlay), so every rover starts on
+    the new map. Rovers share map.txt and only record the mines they disarm, so any number of them can use it.
+    :param grid: The map as a list of rows
+    :return:
+    """
+    with open('map.txt', 'w') as f:
+        f.write(f'{len(grid)} {len(grid[0])}\n' + '\n'.join(' '.join(map(str, row)) for row in grid))
+
+    for overlay in glob.glob('map_*.overlay'):
+        os.remove(overlay)
+    _map_files.clear()  # The maps were just rewritten, so MapFiles loaded before are stale
  
 
-def update_rover_path(rover_id: int, row: int, col: int) -> None:
+class MapFile:
+    """
+    A map.txt loaded once per process, in place of mine_check's open and line scan per call.
+    Cells are queried in place in the file's bytes through an index of line starts, and the mines are indexed once,
+    so listing them costs O(mines). With an overlay, the map is a rover's view of map.txt: the overlay file lists the
+    cells the rover disarmed, one 'row col' line each. flush() appends this process's new lines to it, and a cell
+    that still looks like a mine is re-checked against lines other clients appended since, so clients running the
+    same rover see each other's disarmed mines. Without an overlay, flush() writes the map itself back. Either way
+    disarming only changes memory until flush(), which runs for every map at exit.
+    """
+
+    def __init__(self, file_name: str, overlay: str = None):
+        """
+        :param file_name: Map file, with its 'rows cols' header line
+        :param overlay: File of the cells a rover disarmed on this map, or None to change the map file itself
+        """
+        self.file_name = file_name
+        self.overlay = overlay
+        with open(file_name, 'rb') as f:
+            self.text = bytearray(f.read())
+        self.line_starts = [0]
+        newline = self.text.find(b'\n')
+        while newline >= 0:
+            self.line_starts.append(newline + 1)
+            newline = self.text.find(b'\n', newline + 1)
+        self.mines = set()  # (row, col) of every active mine, in mine_check's coordinates
+        for row, start in enumerate(self.line_starts[1:], 1):
+            end = self.text.find(b'\n', start)
+            col = self.text.find(b'1', start, len(self.text) if end < 0 else end)
+            while col >= 0:
+                self.mines.add((row, col - start))
+                col = self.text.find(b'1', col + 1, len(self.text) if end < 0 else end)
+        self.pending = []  # (row, col) of the mines disarmed here and not flushed yet, in mine_check's coordinates
+        self.overlay_read = 0  # Bytes of the overlay file applied so far
+        self.dirty = False
+        self.refresh()  # Mines the rover disarmed before
+
+    def refresh(self) -> None:
+        """
+        Applies the overlay lines appended since the last refresh, by this or any other process
+        :return:
+        """
+        if self.overlay is None:
+            return
+        try:
+            with open(self.overlay, 'rb') as f:
+                f.seek(self.overlay_read)
+                appended = f.read()
+        except FileNotFoundError:
+            return
+        appended = appended[:appended.rfind(b'\n') + 1]  # Whole lines only, a line may still be being written
+        self.overlay_read += len(appended)
+        cells = [int(value) for value in appended.split()]
+        for row, col in zip(cells[0::2], cells[1::2]):
+            start = self.line_starts[row + 1] + col * 2
+            if self.text[start] == ord('1'):
+                self.text[start] = ord('X')
+                self.mines.discard((row + 1, col * 2))
+
+    def is_mine(self, row: int, col: int) -> bool:
+        """
+        Checks for an active mine at row, col
+        :param row: Row, counting the header line as row 0
+        :param col: Character in the row, 2 per cell
+        :return:
+        """
+        if self.text[self.line_starts[row] + col] != ord('1'):
+            return False
+        self.refresh()  # Another client may have disarmed it since
+        return self.text[self.line_starts[row] + col] == ord('1')
+
+    def disarm(self, row: int, col: int) -> None:
+        """
+        Marks the mine at row, col as X, to be written back by flush()
+        :param row: Row of the mine
+        :param col: Col of the mine
+        :return:
+        """
+        self.text[self.line_starts[row] + col] = ord('X')
+        self.mines.discard((row, col))
+        self.pending.append((row, col))
+        self.dirty = True
+
+    def mine_locations(self) -> list[tuple[int, int]]:
+        """
+        Returns the active mines in row order, in mine_check's coordinates
+        :return:
+        """
+        return sorted(self.mines)
+
+    def flush(self) -> None:
+        """
+        Appends the newly disarmed mines to the overlay, or writes the map without one, if any mine was disarmed
+        since it was loaded or last flushed
+        :return:
+        """
+        if not self.dirty:
+            return
+        if self.overlay is None:
+            with open(self.file_name, 'wb') as f:
+                f.write(self.text)
+        else:
+            with open(self.overlay, 'a') as f:  # One appending write, map coordinates as in mines.txt
+                f.write(''.join(f'{row - 1} {col // 2}\n' for row, col in self.pending))
+        self.pending = []
+        self.dirty = False
+
+
+_map_files = {}  # (file name, overlay) -> MapFile loaded by this process
+
+
+def get_map_file(file_name: str, overlay: str = None) -> MapFile:
+    """
+    Returns the process's MapFile for a map, or a rover's view of it through an overlay, loading it on first use
+    :param file_name: Map file
+    :param overlay: A rover's overlay file, or None for the map itself
+    :return:
+    """
+    if (file_name, overlay) not in _map_files:
+        _map_files[file_name, overlay] = MapFile(file_name, overlay)
+    return _map_files[file_name, overlay]
+
+
+def flush_maps() -> None:
     """
-    Updates the rover path given the row and col    
-    :param rover_id: Rover id
-    :param row: Row to update
-    :param col: Col to update
+    Writes back every loaded map with disarmed mines
     :return:
     """
-    rover_path = open(f'rover_{rover_id}.txt', 'rb+')
-    for i in range(row):  # Align file pointer to correct row
-        next(rover_path)
+    for map_file in _map_files.values():
+        map_file.flush()
 
-    rover_path.seek(col, 1)  # Align file pointer to correct col
-    rover_path.write(bytes('*', 'utf-8'))  # Marking rover path
-    rover_path.close()
+
+atexit.register(flush_maps)
 
 
 def mine_check(row, col, rover_id=None, disable=False):
@@ -117,27 +218,27 @@ def mine_check(row, col, rover_id=None, disable=False):
     :return:
     """
 
-    if rover_id is None:
-        rover_map = open(f'map.txt', 'rb+')
-    else:
-        rover_map = open(f'map_{rover_id}.txt', 'rb+')
-
-    for i in range(row):
-        next(rover_map)
+    # Loaded once per process; a rover sees map.txt through the overlay of the mines it disarmed
+    rover_map = get_map_file('map.txt', None if rover_id is None else f'map_{rover_id}.overlay')
 
-    rover_map.seek(col, 1)
-
-    if rover_map.read(1).decode('utf-8') == '1':  # Checking for mine
+    if rover_map.is_mine(row, col):  # Checking for mine
         if disable:
-            rover_map.seek(-1, 1)  # Move the pointer 1 back to reset
-            rover_map.write(bytes('X', 'utf-8'))  # Mark mine as X (for now)
-        rover_map.close()
+            rover_map.disarm(row, col)  # Mark mine as X (for now), written back by flush_maps
         return True
 
-    rover_map.close()
     return False
 
 
+def blank_rover_path(rows: int, cols: int) -> str:
+    """
+    Returns the contents of a new rover_<id>.txt: an empty first line, then rows of '0's separated by spaces
+    :param rows: Total number of rows
+    :param cols: Total number of cols
+    :return:
+    """
+    return '\n' + '\n'.join([' '.join(['0'] * cols)] * rows)
+
+
 def create_rover_path(rover_id, rows, cols):
     """
     Initializes the map for each rover
@@ -147,29 +248,63 @@ def create_rover_path(rover_id, rows, cols):
     :return:
     """
     with open(f'rover_{rover_id}.txt', 'w') as f:
-        f.write('\n')
-        for i in range(rows):
-            for j in range(cols):
-                f.write('0')
-                if j < (cols - 1):
-                    f.write(' ')
-            if i < (rows - 1):  # This removes extra line in the map
-                f.write('\n')
+        f.write(blank_rover_path(rows, cols))
+
+
+class RoverPath:
+    """
+    A rover's rover_<id>.txt kept in memory while it moves, in place of opening and rewriting the file per move.
+    Rows are fixed width, so marking a cell is one byte store at a computed offset. The file is written in one go
+    by flush(), at the end of the run and every `checkpoint` marks if one is given.
+    """
+
+    def __init__(self, rover_id: int, rows: int, cols: int, checkpoint: int = 0):
+        """
+        :param rover_id: Rover id
+        :param rows: Total number of rows
+        :param cols: Total number of cols
+        :param checkpoint: Marks between flushes, or 0 to flush only when asked
+        """
+        self.file_name = f'rover_{rover_id}.txt'
+        self.cols = cols
+        self.cells = bytearray(blank_rover_path(rows, cols), 'ascii')
+        self.checkpoint = checkpoint
+        self.unflushed = 0
+
+    def offset(self, row: int, col: int) -> int:
+        """
+        Returns where (row, col) is in the path: row 1 is the first map row, col counts characters
+        :param row: Row, counting the empty first line as row 0
+        :param col: Character in the row, 2 per cell
+        :return:
+        """
+        return 1 + (row - 1) * 2 * self.cols + col  # Every row is 2 * cols - 1 characters and its newline
+
+    def mark(self, row: int, col: int) -> None:
+        """
+        Marks the rover path at row, col with '*'
+        :param row: Row to update
+        :param col: Col to update
+        :return:
+        """
+        self.cells[self.offset(row, col)] = ord('*')
+        self.unflushed += 1
+        if self.checkpoint and self.unflushed >= self.checkpoint:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the whole path to rover_<id>.txt
+        :return:
+        """
+        with open(self.file_name, 'w') as f:  # Text mode, so lines end as create_rover_path's did
+            f.write(self.cells.decode('ascii'))
+        self.unflushed = 0
 
 def fetch_map_info() -> list[list[int]]:
-    
-    with open('map.txt', 'r') as f:
-        x = f.readline()
-        grid = []
-        row = []
-        while(len(x) != 0):
-            if (x == '\n'):
-                grid.append(row)
-                row = []
-            elif (x == '0'):  
-                row.append(0)            
-            elif (x == '1'):
-                row.append(1)
-            x = f.read(1)
-        grid.append(row)
-    return grid
\ No newline at end of file
+    """
+    Reads map.txt (or its memory-mapped map.bin copy when that is current)
+    :return: The map as a list of rows
+    """
+    rows, cols, cells = map_loader.load_map('map.txt')
+    return [list(cells[x * cols:(x + 1) * cols]) for x in range(rows)]
\ No newline at end of file
@@ -1,25 +1,17 @@
-from hashlib import sha256
 import random
-from map import mine_check
+from map import get_map_file
+import pin_cache
+import pin_solver
+from functools import partial
 
-def disarm_mine(serialNum: str) -> int:    
-    pin = 0
-    while True:
-        temp_mine_key = str(pin) + serialNum
-        hashed_data = sha256(temp_mine_key.encode()).hexdigest()
-        if hashed_data[0:6] == '000000':
-            return pin
-
-        pin += 1
+def disarm_mine(serialNum: str, backend: str = 'hashlib', difficulty: int = pin_solver.DIFFICULTY) -> int:
+    solve = partial(pin_solver.find_valid_pin, backend=backend)
+    return pin_cache.default_cache().get_or_solve(serialNum, difficulty, pin_solver.PIN_SERIAL, solve)
 
 
 def get_mines_location(row, col):
-    location_list = []
-    for i in range(row):
-        for j in range(col):
-            if mine_check(i + 1, j * 2):
-                location_list.append((i + 1, j * 2))
-    return location_list
+    # From map.txt's mine index, in the same row by row order as checking every cell
+    return [(i, j) for i, j in get_map_file('map.txt').mine_locations() if i <= row and j < col * 2]
 
 
 def generate_mines_txt(row, col):